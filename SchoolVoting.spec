@@ -1,4 +1,12 @@
 # -*- mode: python ; coding: utf-8 -*-
+#
+# pyinstaller SchoolVoting.spec               one-file exe (unpacks on every launch)
+# pyinstaller SchoolVoting.spec -- --onedir   dist/SchoolVoting-dir/, starts faster
+import argparse
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--onedir', action='store_true')
+options = parser.parse_args()
 
 
 a = Analysis(
@@ -22,20 +30,44 @@ a = Analysis(
 )
 pyz = PYZ(a.pure)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
-    [],
-    name='SchoolVoting',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False
-    # Remove this line: cipher=block_cipher,
-)
\ No newline at end of file
+if options.onedir:
+    # No archive to unpack and no UPX to decompress at launch
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='SchoolVoting',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        strip=False,
+        upx=False,
+        name='SchoolVoting-dir'
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        [],
+        name='SchoolVoting',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False
+        # Remove this line: cipher=block_cipher,
+    )
@@ -0,0 +1,240 @@
+# Merkle tree over an election's ballots, for auditing exported results.
+#
+# Every ballot is a leaf, hashed from its candidate index and cast time (to
+# the millisecond, as stored). The tree is the one from RFC 6962 (Certificate
+# Transparency): leaves are SHA-256(0x00 || leaf), inner nodes
+# SHA-256(0x01 || left || right), and a tree of n leaves splits at the
+# largest power of two below n. MerkleLog keeps only the roots of the perfect
+# subtrees along the right edge, like the digits of a binary counter, so
+# adding a ballot costs O(1) hashes amortised and memory is O(log n).
+#
+# The app adds each ballot as it is counted, and every export carries the
+# root of the ballots it holds. This module's CLI re-derives that root from an
+# export, hashing chunks of 2^16 ballots in parallel processes, and proves or
+# checks that a single ballot is included:
+#
+#   python audit.py verify results.svb
+#   python audit.py prove results.svb 1234        (ballot numbers start at 1)
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+from itertools import islice
+
+CHUNK_SIZE = 1 << 16
+_LEAF = struct.Struct('<Id')
+EMPTY_ROOT = hashlib.sha256(b'').digest()
+
+
+def leaf_hash(candidate_idx, cast_at):
+    t = math.nan if cast_at is None else round(cast_at, 3)
+    return hashlib.sha256(b'\x00' + _LEAF.pack(candidate_idx, t)).digest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+
+class MerkleLog:
+    __slots__ = ('size', 'peaks')
+
+    def __init__(self):
+        self.size = 0
+        self.peaks = []  # roots of the perfect subtrees, largest first
+
+    def append(self, candidate_idx, cast_at):
+        self.append_hash(leaf_hash(candidate_idx, cast_at))
+
+    def append_hash(self, h):
+        self.size += 1
+        # Merge equal-sized subtrees: one merge per trailing 1 bit of the old size
+        n = self.size
+        while not n & 1:
+            h = node_hash(self.peaks.pop(), h)
+            n >>= 1
+        self.peaks.append(h)
+
+    def extend(self, ballots):
+        for candidate_idx, cast_at in ballots:
+            self.append(candidate_idx, cast_at)
+
+    def tee(self, ballots):
+        # Pass (candidate_index, cast_at) pairs through, adding each one
+        for ballot in ballots:
+            self.append(*ballot)
+            yield ballot
+
+    def root(self):
+        if not self.peaks:
+            return EMPTY_ROOT
+        h = self.peaks[-1]
+        for peak in reversed(self.peaks[:-1]):
+            h = node_hash(peak, h)
+        return h
+
+    def root_hex(self):
+        return self.root().hex()
+
+
+def merkle_root(hashes):
+    log = MerkleLog()
+    for h in hashes:
+        log.append_hash(h)
+    return log.root()
+
+
+def inclusion_proof(index, size, subtree):
+    # Sibling hashes from leaf `index` up to the root of a `size`-leaf tree
+    # (RFC 6962 audit path). subtree(lo, hi) returns the hash of leaves lo..hi-1.
+    path = []
+    lo, hi = 0, size
+    while hi - lo > 1:
+        k = _split(hi - lo)
+        if index < lo + k:
+            path.append(subtree(lo + k, hi))
+            hi = lo + k
+        else:
+            path.append(subtree(lo, lo + k))
+            lo += k
+    return path[::-1]
+
+
+def verify_inclusion(leaf, index, size, proof, root):
+    # RFC 9162 section 2.1.3.2
+    if index >= size:
+        return False
+    fn, sn = index, size - 1
+    h = leaf
+    for sibling in proof:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            h = node_hash(sibling, h)
+            while not fn & 1 and fn:
+                fn >>= 1
+                sn >>= 1
+        else:
+            h = node_hash(h, sibling)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and h == root
+
+
+def _split(n):
+    # Largest power of two strictly below n
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+def _chunk_root(ballots):
+    return merkle_root(leaf_hash(idx, t) for idx, t in ballots)
+
+
+class _ExportTree:
+    # Subtree hashes of an export, from per-chunk roots hashed in parallel
+    # plus the leaves of up to two chunks kept in memory
+    def __init__(self, path, keep_chunk=None, max_workers=None):
+        # Imported here: the app imports this module for MerkleLog and
+        # shouldn't pay for multiprocessing at startup
+        from concurrent.futures import ProcessPoolExecutor
+
+        from export import read_export
+
+        self.chunk_roots = []
+        self.leaves = {}  # chunk number -> leaf hashes
+        self.recorded = None
+        records = read_export(path)
+        ballots = ((r['candidate_index'], r['cast_at']) for r in self._scan(records))
+        workers = max_workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers) as pool:
+            pending = []
+            chunk_no = 0
+            while True:
+                chunk = list(islice(ballots, CHUNK_SIZE))
+                if not chunk:
+                    break
+                if chunk_no == keep_chunk or len(chunk) < CHUNK_SIZE:
+                    self.leaves[chunk_no] = [leaf_hash(idx, t) for idx, t in chunk]
+                if len(chunk) == CHUNK_SIZE:
+                    pending.append(pool.submit(_chunk_root, chunk))
+                chunk_no += 1
+                # Bound how many chunks are held in memory at once
+                if len(pending) > 4 * workers:
+                    self.chunk_roots.extend(f.result() for f in pending)
+                    pending = []
+            self.chunk_roots.extend(f.result() for f in pending)
+        self.size = len(self.chunk_roots) * CHUNK_SIZE + sum(
+            len(leaves) for n, leaves in self.leaves.items() if n >= len(self.chunk_roots))
+
+    def _scan(self, records):
+        for record in records:
+            if record['type'] == 'ballot':
+                yield record
+            elif record['type'] == 'audit':
+                self.recorded = record
+
+    def subtree(self, lo, hi):
+        if hi - lo == CHUNK_SIZE and lo % CHUNK_SIZE == 0 and lo // CHUNK_SIZE < len(self.chunk_roots):
+            return self.chunk_roots[lo // CHUNK_SIZE]
+        if hi - lo > CHUNK_SIZE or lo // CHUNK_SIZE != (hi - 1) // CHUNK_SIZE:
+            k = _split(hi - lo)
+            return node_hash(self.subtree(lo, lo + k), self.subtree(lo + k, hi))
+        offset = (lo // CHUNK_SIZE) * CHUNK_SIZE
+        return merkle_root(self.leaves[lo // CHUNK_SIZE][lo - offset:hi - offset])
+
+    def root(self):
+        return self.subtree(0, self.size) if self.size else EMPTY_ROOT
+
+    def leaf(self, index):
+        return self.leaves[index // CHUNK_SIZE][index % CHUNK_SIZE]
+
+
+def verify_export(path, max_workers=None):
+    # {'ok': bool, 'ballots': n, 'root': computed hex, 'recorded': hex or None}
+    tree = _ExportTree(path, max_workers=max_workers)
+    recorded = tree.recorded or {}
+    root = tree.root().hex()
+    return {'ok': root == recorded.get('merkle_root') and tree.size == recorded.get('ballots'),
+            'ballots': tree.size, 'root': root, 'recorded': recorded.get('merkle_root')}
+
+
+def prove_ballot(path, number, max_workers=None):
+    # Inclusion proof for ballot `number` (1-based, as numbered in exports)
+    index = number - 1
+    tree = _ExportTree(path, keep_chunk=index // CHUNK_SIZE, max_workers=max_workers)
+    if not 0 <= index < tree.size:
+        raise ValueError(f"The export has {tree.size} ballots, no ballot {number}")
+    proof = inclusion_proof(index, tree.size, tree.subtree)
+    root = tree.root()
+    return {'ballot': number, 'ballots': tree.size, 'leaf': tree.leaf(index).hex(),
+            'proof': [h.hex() for h in proof], 'root': root.hex(),
+            'recorded': (tree.recorded or {}).get('merkle_root'),
+            'ok': verify_inclusion(tree.leaf(index), index, tree.size, proof, root)}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check exported ballots against their Merkle root")
+    sub = parser.add_subparsers(dest='command', required=True)
+    verify = sub.add_parser('verify', help="recompute the root of every ballot in an export")
+    verify.add_argument('path')
+    prove = sub.add_parser('prove', help="inclusion proof for one ballot")
+    prove.add_argument('path')
+    prove.add_argument('ballot', type=int)
+    for p in (verify, prove):
+        p.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'verify':
+        result = verify_export(args.path, args.workers)
+    else:
+        result = prove_ballot(args.path, args.ballot, args.workers)
+        result['ok'] = result['ok'] and result['root'] == result['recorded']
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+# Compact per-ballot record store with turnout analytics.
+#
+# Each ballot is three parallel array entries: candidate index (uint16),
+# timestamp (float64) and booth number (uint16, interned booth names), i.e.
+# 12 bytes per ballot, about 12 MB for a million. Timestamps come from
+# time.monotonic() shifted once to wall-clock time, so they never jump
+# backwards but can still be shown as times of day.
+#
+# Turnout queries run vectorised with NumPy when it is installed and fall back
+# to plain Python otherwise. NumPy is only imported by the first query, since
+# importing it takes longer than starting the rest of the app.
+import math
+import time
+from array import array
+from bisect import bisect_right
+
+_np = False  # not imported yet
+
+# Added to time.monotonic() to get wall-clock seconds
+_CLOCK_OFFSET = time.time() - time.monotonic()
+
+
+def now():
+    return _CLOCK_OFFSET + time.monotonic()
+
+
+def _numpy():
+    # The numpy module, or None when it isn't installed
+    global _np
+    if _np is False:
+        try:
+            import numpy as _np
+        except ImportError:
+            _np = None
+    return _np
+
+
+class BallotLog:
+    __slots__ = ('candidates', 'times', 'booths', 'booth_names', 'booth_ids')
+
+    def __init__(self):
+        self.candidates = array('H')
+        self.times = array('d')
+        self.booths = array('H')
+        self.booth_names = []
+        self.booth_ids = {}
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def __iter__(self):
+        names = self.booth_names
+        for idx, t, booth in zip(self.candidates, self.times, self.booths):
+            yield idx, t, names[booth]
+
+    @property
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.candidates, self.times, self.booths))
+
+    def append(self, candidate_idx, booth='', t=None):
+        self.candidates.append(candidate_idx)
+        self.times.append(now() if t is None else t)
+        self.booths.append(self._booth_id(booth))
+
+    def extend(self, candidate_indices, booth='', t=None):
+        # A batch from one booth, all stamped with the same time
+        start = len(self.candidates)
+        self.candidates.extend(candidate_indices)
+        added = len(self.candidates) - start
+        self.times.extend([now() if t is None else t] * added)
+        self.booths.extend([self._booth_id(booth)] * added)
+
+    @classmethod
+    def from_ballots(cls, ballots, booth=''):
+        # ballots: iterable of (candidate_index, cast_at) as stored on disk
+        log = cls()
+        booth_id = log._booth_id(booth)
+        for idx, t in ballots:
+            log.candidates.append(idx)
+            log.times.append(math.nan if t is None else t)
+            log.booths.append(booth_id)
+        return log
+
+    def counts_by_booth(self):
+        np = _numpy()
+        if np is not None and len(self):
+            counts = np.bincount(np.frombuffer(self.booths, dtype=np.uint16),
+                                 minlength=len(self.booth_names))
+            return dict(zip(self.booth_names, counts.tolist()))
+        counts = [0] * len(self.booth_names)
+        for booth in self.booths:
+            counts[booth] += 1
+        return dict(zip(self.booth_names, counts))
+
+    def turnout_per_minute(self):
+        # [(minute start as unix time, ballots), ...] from the first ballot's
+        # minute to the last, including minutes with no ballots
+        np = _numpy()
+        if np is not None:
+            times = self._sorted_times()
+            if not len(times):
+                return []
+            minutes = (times // 60).astype(np.int64)
+            first = int(minutes[0])
+            counts = np.bincount(minutes - first)
+            return [(float((first + i) * 60), int(c)) for i, c in enumerate(counts)]
+        times = self._sorted_times()
+        if not times:
+            return []
+        first = int(times[0] // 60)
+        counts = [0] * (int(times[-1] // 60) - first + 1)
+        for t in times:
+            counts[int(t // 60) - first] += 1
+        return [((first + i) * 60.0, c) for i, c in enumerate(counts)]
+
+    def rate_over_time(self, window=60.0, step=10.0):
+        # [(time, ballots per minute over the preceding `window` seconds), ...]
+        # sampled every `step` seconds across the whole voting period
+        np = _numpy()
+        times = self._sorted_times()
+        if not len(times):
+            return []
+        scale = 60.0 / window
+        if np is not None:
+            grid = np.arange(times[0], times[-1] + step, step)
+            inside = (np.searchsorted(times, grid, side='right')
+                      - np.searchsorted(times, grid - window, side='right'))
+            return list(zip(grid.tolist(), (inside * scale).tolist()))
+        samples = []
+        t = times[0]
+        while t < times[-1] + step:
+            inside = bisect_right(times, t) - bisect_right(times, t - window)
+            samples.append((t, inside * scale))
+            t += step
+        return samples
+
+    def peak_minute(self):
+        turnout = self.turnout_per_minute()
+        if not turnout:
+            return None
+        return max(turnout, key=lambda item: item[1])
+
+    def _sorted_times(self):
+        # Ballots without a known time are left out of time-based queries
+        np = _numpy()
+        if np is not None:
+            times = np.frombuffer(self.times, dtype=np.float64)
+            times = times[~np.isnan(times)]
+            if len(times) > 1 and (np.diff(times) < 0).any():
+                times = np.sort(times)
+            return times
+        times = [t for t in self.times if not math.isnan(t)]
+        if any(b < a for a, b in zip(times, times[1:])):
+            times.sort()
+        return times
+
+    def _booth_id(self, booth):
+        booth_id = self.booth_ids.get(booth)
+        if booth_id is None:
+            booth_id = self.booth_ids[booth] = len(self.booth_names)
+            self.booth_names.append(booth)
+        return booth_id
@@ -0,0 +1,335 @@
+# Headless tally of many saved elections at once.
+#
+# Reads every results file in a directory tree: .json summaries from "Save
+# Results", ballot exports (.csv, .jsonl, .svb), vote journals (.journal)
+# and SQLite stores (.db). Other JSON files that live beside them, like
+# session.json and stats.json, are listed as skipped. Files are tallied in a process pool, each reduced to
+# per-candidate counts before it is sent back, and merged as the results
+# arrive, so only one small summary per election is ever held in memory.
+#
+# Elections with the same name are merged by candidate name (e.g. one class
+# election collected from several booths). A file whose ballots have the same
+# Merkle root as one already counted (an export of a journal, or the same
+# file copied twice) is reported and skipped instead of counted twice.
+#
+# Ranked elections are decided by STV (instant-runoff for one seat) over the
+# merged rankings, which only journals and databases keep. When any part of a
+# ranked election comes from a summary or an export, the report gives its
+# first preferences only and no winner.
+#
+#   python school_voting.py tally <directory> [--output report.json|report.csv]
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from audit import MerkleLog
+from export import FORMATS, read_export
+from journal import read_records, replay
+from ranked import RankedBallots, count_stv, numpy_available
+
+EXTENSIONS = ('.json', '.journal', '.db') + FORMATS
+
+
+# A file with a results extension that holds something else
+class NotResults(Exception):
+    pass
+
+
+def find_files(directory):
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if os.path.splitext(filename)[1].lower() in EXTENSIONS:
+                yield os.path.join(dirpath, filename)
+
+
+def tally_file(path):
+    # [{'election', 'candidates': [names], 'votes': [counts], 'ballots',
+    #   'merkle_root', 'ballot_type', 'seats', 'rankings'}] for every election
+    #   in the file, or {'error': message} or {'skipped': reason}. rankings
+    #   is a list of candidate index lists for ranked elections whose file
+    #   keeps them, otherwise None.
+    try:
+        ext = os.path.splitext(path)[1].lower()
+        if ext == '.json':
+            elections = [_tally_summary(path)]
+        elif ext == '.journal':
+            elections = _tally_journal(path)
+        elif ext == '.db':
+            elections = _tally_database(path)
+        else:
+            elections = [_tally_export(path)]
+    except NotResults as e:
+        return {'path': path, 'skipped': str(e)}
+    except Exception as e:
+        return {'path': path, 'error': f"{type(e).__name__}: {e}"}
+    return {'path': path, 'elections': elections}
+
+
+def _tally_summary(path):
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or 'election_name' not in data or 'votes' not in data:
+        raise NotResults("not a results summary")
+    votes = data['votes']
+    return {'election': data['election_name'], 'candidates': list(votes),
+            'votes': list(votes.values()), 'ballots': data.get('ballots', sum(votes.values())),
+            'merkle_root': data.get('merkle_root'),
+            'ballot_type': data.get('ballot_type', 'single'), 'seats': data.get('seats', 1),
+            'rankings': None}
+
+
+def _tally_export(path):
+    election = None
+    counts = []
+    totals = None
+    root = None
+    for record in read_export(path):
+        kind = record['type']
+        if kind == 'election':
+            election = record
+            counts = [0] * len(record.get('candidates', ()))
+        elif kind == 'ballot':
+            idx = record['candidate_index']
+            if idx >= len(counts):
+                counts.extend([0] * (idx + 1 - len(counts)))
+            counts[idx] += 1
+        elif kind == 'total':
+            totals = totals or {}
+            totals[record['candidate_index']] = (record['candidate'], record['votes'])
+        elif kind == 'audit':
+            root = record['merkle_root']
+    if election is None or totals is None:
+        raise ValueError("not a complete results export")
+    names = [totals[idx][0] for idx in sorted(totals)]
+    counts.extend([0] * (len(names) - len(counts)))
+    if counts != [totals[idx][1] for idx in sorted(totals)]:
+        raise ValueError("ballots do not add up to the recorded totals")
+    return {'election': election['election'], 'candidates': names, 'votes': counts,
+            'ballots': sum(counts), 'merkle_root': root,
+            'ballot_type': election.get('ballot_type', 'single'), 'seats': election.get('seats', 1),
+            'rankings': None}
+
+
+def _tally_journal(path):
+    ballots = _journal_ballots(path)
+    elections = []
+    for name, state in replay(path).items():
+        tally = state['tally']
+        root, rankings = ballots.get(name, (None, []))
+        elections.append({'election': name, 'candidates': list(tally.names),
+                          'votes': list(tally.counts), 'ballots': tally.total,
+                          'merkle_root': root.root_hex() if root else None,
+                          'ballot_type': state['ballot_type'], 'seats': state['seats'],
+                          'rankings': rankings if state['ballot_type'] == 'ranked' else None})
+    return elections
+
+
+def _tally_database(path):
+    # Read-only, so a store still open in the app is never changed
+    try:
+        conn = sqlite3.connect(f"file:{os.path.abspath(path)}?mode=ro", uri=True)
+    except sqlite3.Error as e:
+        raise ValueError(f"cannot open database: {e}")
+    try:
+        try:
+            rows = conn.execute(
+                "SELECT id, name, ballot_type, seats FROM elections ORDER BY id").fetchall()
+        except sqlite3.DatabaseError:
+            raise NotResults("not an election database")
+        elections = []
+        for election_id, name, ballot_type, seats in rows:
+            names = [n for (n,) in conn.execute(
+                "SELECT name FROM candidates WHERE election_id = ? ORDER BY idx", (election_id,))]
+            counts = [0] * len(names)
+            root = MerkleLog()
+            rankings = [] if ballot_type == 'ranked' else None
+            for idx, cast_at, ranking in conn.execute(
+                    "SELECT candidate_idx, cast_at, ranking FROM ballots WHERE election_id = ? "
+                    "ORDER BY id", (election_id,)):
+                if idx >= len(counts):
+                    counts.extend([0] * (idx + 1 - len(counts)))
+                counts[idx] += 1
+                root.append(idx, cast_at)
+                if rankings is not None and ranking is not None:
+                    rankings.append(json.loads(ranking))
+            elections.append({'election': name, 'candidates': names,
+                              'votes': counts[:len(names)], 'ballots': root.size,
+                              'merkle_root': root.root_hex(), 'ballot_type': ballot_type,
+                              'seats': seats, 'rankings': rankings})
+        return elections
+    finally:
+        conn.close()
+
+
+def _journal_ballots(path):
+    # (Merkle tree, rankings) of each live election's ballots, in one pass
+    ballots = {}
+    for record in read_records(path):
+        op = record['op']
+        name = record['election']
+        if op in ('election', 'candidates'):
+            # Registering candidates starts the count over, as in replay()
+            ballots[name] = (MerkleLog(), [])
+        elif op == 'discard':
+            ballots.pop(name, None)
+        elif op == 'vote' and name in ballots:
+            root, rankings = ballots[name]
+            root.append(record['candidate'], record.get('t'))
+            if 'ranking' in record:
+                rankings.append(record['ranking'])
+    return ballots
+
+
+class Report:
+    def __init__(self):
+        self.elections = OrderedDict()  # name -> merged counts and sources
+        self.seen_roots = {}  # merkle root -> first file counted with it
+        self.duplicates = []
+        self.errors = []
+        self.skipped = []
+        self.files = 0
+
+    def add(self, result):
+        self.files += 1
+        if 'error' in result:
+            self.errors.append((result['path'], result['error']))
+            return
+        if 'skipped' in result:
+            self.skipped.append((result['path'], result['skipped']))
+            return
+        for part in result['elections']:
+            root = part['merkle_root']
+            if root and part['ballots'] and root in self.seen_roots:
+                self.duplicates.append((result['path'], part['election'], self.seen_roots[root]))
+                continue
+            if root:
+                self.seen_roots[root] = result['path']
+            merged = self.elections.setdefault(part['election'], {
+                'votes': OrderedDict(), 'ballots': 0, 'sources': [], 'ballot_type': 'single',
+                'seats': 1, 'rankings': [], 'first_preferences_only': False})
+            for name, votes in zip(part['candidates'], part['votes']):
+                merged['votes'][name] = merged['votes'].get(name, 0) + votes
+            merged['ballots'] += part['ballots']
+            merged['sources'].append(result['path'])
+            if part['ballot_type'] == 'ranked':
+                merged['ballot_type'] = 'ranked'
+                merged['seats'] = part['seats']
+            if part['rankings'] is None:
+                # A ranked election exported by one booth looks like any
+                # other export, so this is only decided in as_dict()
+                merged['first_preferences_only'] = True
+            else:
+                merged['rankings'].append((part['candidates'], part['rankings']))
+
+    def as_dict(self):
+        elections = []
+        for name, merged in self.elections.items():
+            ranked = sorted(merged['votes'].items(), key=lambda item: -item[1])
+            entry = {
+                'election': name,
+                'ballots': merged['ballots'],
+                'winner': ranked[0][0] if ranked and ranked[0][1] else None,
+                'results': [{'candidate': c, 'votes': v} for c, v in ranked],
+                'sources': merged['sources']
+            }
+            if merged['ballot_type'] == 'ranked':
+                # results hold first preferences; the winner comes from STV
+                entry['ballot_type'] = 'ranked'
+                entry['seats'] = merged['seats']
+                entry['winner'] = None
+                if merged['first_preferences_only'] or not numpy_available():
+                    entry['count'] = "first preferences only"
+                else:
+                    entry['count'] = "STV"
+                    entry['elected'] = _count_ranked(merged)
+                    if merged['seats'] == 1 and entry['elected']:
+                        entry['winner'] = entry['elected'][0]
+            elections.append(entry)
+        return {
+            'files': self.files,
+            'elections': elections,
+            'total_ballots': sum(e['ballots'] for e in elections),
+            'duplicates': [{'path': p, 'election': e, 'same_as': s} for p, e, s in self.duplicates],
+            'skipped': [{'path': p, 'reason': r} for p, r in self.skipped],
+            'errors': [{'path': p, 'error': e} for p, e in self.errors]
+        }
+
+
+def _count_ranked(merged):
+    # Names elected by STV over every part's rankings, in merged candidate order
+    names = list(merged['votes'])
+    index = {name: idx for idx, name in enumerate(names)}
+    ballots = RankedBallots(len(names))
+    for candidates, rankings in merged['rankings']:
+        for ranking in rankings:
+            ballots.add([index[candidates[idx]] for idx in ranking])
+    return [names[idx] for idx in count_stv(ballots, merged['seats'])['elected']]
+
+
+def tally_directory(directory, max_workers=None):
+    report = Report()
+    with ProcessPoolExecutor(max_workers) as pool:
+        for result in pool.map(tally_file, find_files(directory), chunksize=4):
+            report.add(result)
+    return report
+
+
+def write_report(report, path):
+    data = report.as_dict()
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['election', 'candidate', 'votes', 'share'])
+            for e in data['elections']:
+                for row in e['results']:
+                    share = row['votes'] / e['ballots'] if e['ballots'] else 0
+                    writer.writerow([e['election'], row['candidate'], row['votes'], f"{share:.4f}"])
+    else:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=4)
+
+
+def print_report(report, out=sys.stdout):
+    data = report.as_dict()
+    for e in data['elections']:
+        print(f"{e['election']} - {e['ballots']} ballots from {len(e['sources'])} file(s)", file=out)
+        if 'elected' in e:
+            print(f"  Elected by STV, {e['seats']} seat(s): {', '.join(e['elected']) or 'nobody'}; "
+                  f"first preferences:", file=out)
+        elif e.get('ballot_type') == 'ranked':
+            print("  Ranked, but not every file keeps the rankings: first preferences only, "
+                  "no winner", file=out)
+        for n, row in enumerate(e['results'], 1):
+            share = row['votes'] / e['ballots'] * 100 if e['ballots'] else 0
+            print(f"  {n:>3}. {row['candidate']:<30} {row['votes']:>8} {share:6.1f}%", file=out)
+    print(f"\n{len(data['elections'])} elections, {data['total_ballots']} ballots, "
+          f"{data['files']} files", file=out)
+    for d in data['duplicates']:
+        print(f"Skipped {d['path']}: {d['election']} already counted from {d['same_as']}", file=out)
+    for skipped in data['skipped']:
+        print(f"Skipped {skipped['path']}: {skipped['reason']}", file=out)
+    for err in data['errors']:
+        print(f"Failed {err['path']}: {err['error']}", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='school_voting.py tally',
+                                     description="Tally and merge saved elections without the GUI")
+    parser.add_argument('directory')
+    parser.add_argument('--output', help="also write the report as .json or .csv")
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    report = tally_directory(args.directory, args.workers)
+    print_report(report)
+    if args.output:
+        write_report(report, args.output)
+    return 1 if report.errors else 0
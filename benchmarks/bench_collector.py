@@ -0,0 +1,138 @@
+# Load test for the multi-booth collector: starts `collector.py` as a local
+# process, then simulates many booths from several worker processes that all
+# stream votes to it, and checks the merged totals. Then restarts the
+# collector under a connected booth, once with its journal and once without,
+# and checks that the booth's votes still get through.
+#
+#   python benchmarks/bench_collector.py [--processes 4] [--booths 25] [--votes 2000]
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common import ROOT_DIR
+
+from collector import BoothConnection, encode  # noqa: E402
+
+ELECTION = "Load Test"
+CANDIDATES = [f"Candidate {i}" for i in range(8)]
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_collector(port, journal):
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT_DIR, 'collector.py'),
+                               '--host', '127.0.0.1', '--port', str(port),
+                               '--journal', journal],
+                              stdout=subprocess.PIPE, text=True)
+    server.stdout.readline()  # "Collecting votes on ..."
+    return server
+
+
+def stop_collector(server):
+    server.terminate()
+    server.wait()
+
+
+def run_booths(port, worker, booths, votes):
+    async def booth(n):
+        conn = BoothConnection('127.0.0.1', port, f"w{worker}-b{n}", reconnect_delay=0.1)
+        conn.register_election(ELECTION, CANDIDATES)
+        task = asyncio.create_task(conn.run())
+        for i in range(votes):
+            conn.submit(ELECTION, (i * 7 + n) % len(CANDIDATES))
+            if i % 50 == 0:
+                # Let the sender batch and the reader see acks
+                await asyncio.sleep(0)
+        await conn.drain()
+        conn.close()
+        await task
+
+    async def all_booths():
+        await asyncio.gather(*(booth(n) for n in range(booths)))
+
+    asyncio.run(all_booths())
+    return booths * votes
+
+
+async def fetch_results(port):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(encode({'type': 'results', 'election': ELECTION}))
+    await writer.drain()
+    line = await reader.readline()
+    writer.close()
+    return json.loads(line)
+
+
+async def check_restart(port, journal, keep_journal):
+    # 5 votes acknowledged, collector restarted, 3 more: with the journal all
+    # 8 are counted, without it the new session starts over at the 3
+    server = start_collector(port, journal)
+    conn = BoothConnection('127.0.0.1', port, "restart", reconnect_delay=0.1)
+    conn.register_election(ELECTION, CANDIDATES)
+    task = asyncio.create_task(conn.run())
+    try:
+        for i in range(5):
+            conn.submit(ELECTION, i % 2)
+        await asyncio.wait_for(conn.drain(), 10)
+        stop_collector(server)
+        if not keep_journal:
+            os.remove(journal)
+        for i in range(3):
+            conn.submit(ELECTION, i % 2)
+        server = start_collector(port, journal)
+        await asyncio.wait_for(conn.drain(), 10)
+        results = await fetch_results(port)
+    finally:
+        conn.close()
+        await task
+        stop_collector(server)
+    return results['total_votes']
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--booths', type=int, default=25, help="booths per process")
+    parser.add_argument('--votes', type=int, default=2000, help="votes per booth")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        port = free_port()
+        server = start_collector(port, os.path.join(directory, 'load.journal'))
+        try:
+            start = time.perf_counter()
+            with ProcessPoolExecutor(args.processes) as pool:
+                sent = sum(pool.map(run_booths, [port] * args.processes, range(args.processes),
+                                    [args.booths] * args.processes, [args.votes] * args.processes))
+            elapsed = time.perf_counter() - start
+            results = asyncio.run(fetch_results(port))
+        finally:
+            stop_collector(server)
+
+        booths = args.processes * args.booths
+        print(f"booths: {booths}  votes sent: {sent}  counted: {results['total_votes']}")
+        print(f"elapsed: {elapsed:.2f}s  throughput: {sent / elapsed:,.0f} votes/s")
+        if results['total_votes'] != sent:
+            sys.exit("Merged total does not match the votes sent")
+
+        kept = asyncio.run(check_restart(port, os.path.join(directory, 'kept.journal'), True))
+        lost = asyncio.run(check_restart(port, os.path.join(directory, 'lost.journal'), False))
+        print(f"after a collector restart: {kept} of 8 counted with its journal, "
+              f"{lost} of 3 new ones without")
+        if (kept, lost) != (8, 3):
+            sys.exit("Votes were lost or stuck across a collector restart")
+
+
+if __name__ == '__main__':
+    main()
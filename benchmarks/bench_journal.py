@@ -0,0 +1,61 @@
+# Votes/sec through VoteJournal for each durability setting, plus replay speed.
+#
+#   python benchmarks/bench_journal.py [--votes N]
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from journal import VoteJournal, replay  # noqa: E402
+
+SETTINGS = [
+    ('always', {'sync': 'always'}),
+    ('batch 10 / 50ms', {'sync': 'batch', 'max_pending': 10, 'max_delay': 0.05}),
+    ('batch 100 / 250ms', {'sync': 'batch', 'max_pending': 100, 'max_delay': 0.25}),
+    ('batch 1000 / 1s', {'sync': 'batch', 'max_pending': 1000, 'max_delay': 1.0}),
+    ('none', {'sync': 'none'}),
+]
+
+
+def run(label, options, votes, candidates, directory):
+    path = os.path.join(directory, label.replace(' ', '_').replace('/', '') + '.journal')
+    with VoteJournal(path, **options) as journal:
+        journal.log_election('Bench')
+        journal.log_candidates('Bench', [{'name': f"Candidate {i}"} for i in range(candidates)])
+        journal.log_status('Bench', 'voting')
+        picks = [random.randrange(candidates) for _ in range(votes)]
+        start = time.perf_counter()
+        for idx in picks:
+            journal.log_vote('Bench', idx)
+        journal.sync()
+        elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    state = replay(path)
+    replay_elapsed = time.perf_counter() - start
+    assert state['Bench']['tally'].total == votes
+    return votes / elapsed, votes / replay_elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--votes', type=int, default=20000)
+    parser.add_argument('--always-votes', type=int, default=500,
+                        help="votes for the fsync-per-vote setting, which is much slower")
+    parser.add_argument('--candidates', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        print(f"{'setting':<20}{'votes':>10}{'cast votes/s':>16}{'replay votes/s':>18}")
+        for label, options in SETTINGS:
+            votes = args.always_votes if options['sync'] == 'always' else args.votes
+            cast_rate, replay_rate = run(label, options, votes, args.candidates, directory)
+            print(f"{label:<20}{votes:>10}{cast_rate:>16,.0f}{replay_rate:>18,.0f}")
+
+
+if __name__ == '__main__':
+    main()
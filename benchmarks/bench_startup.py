@@ -0,0 +1,81 @@
+# Launch-to-ready time of the app: each run starts a fresh process with
+# --exit-after-startup, which quits as soon as the Welcome tab is painted and
+# saved elections are restored, and the whole process lifetime is timed.
+#
+# Cold runs drop the OS file cache first (Linux as root, or macOS `purge`);
+# elsewhere the first run stands in for a cold start. Frozen builds are timed
+# when they are found in dist/ (or given with --exe).
+#
+#   python benchmarks/bench_startup.py [--runs 5] [--cold] [--exe path ...]
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT_DIR
+
+FROZEN_BUILDS = [
+    ('one-file', os.path.join(ROOT_DIR, 'dist', 'SchoolVoting')),
+    ('one-dir', os.path.join(ROOT_DIR, 'dist', 'SchoolVoting-dir', 'SchoolVoting')),
+]
+
+
+def drop_caches():
+    # True if the OS file cache could be emptied
+    if sys.platform == 'darwin':
+        return subprocess.run(['purge'], capture_output=True).returncode == 0
+    try:
+        os.sync()
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3\n')
+        return True
+    except OSError:
+        return False
+
+
+def launch(command, workdir):
+    start = time.perf_counter()
+    subprocess.run(command + ['--exit-after-startup'], cwd=workdir, check=True)
+    return time.perf_counter() - start
+
+
+def measure(label, command, runs, cold):
+    # Every launch gets an empty working directory, so no saved elections
+    with tempfile.TemporaryDirectory() as workdir:
+        cold_note = "first run"
+        if cold and drop_caches():
+            cold_note = "caches dropped"
+        first = launch(command, workdir)
+        warm = [launch(command, workdir) for _ in range(runs)]
+    print(f"{label:<10} cold: {first * 1000:7.0f} ms ({cold_note})  "
+          f"warm: median {statistics.median(warm) * 1000:.0f} ms, "
+          f"min {min(warm) * 1000:.0f} ms over {runs} runs")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5, help="warm runs per build")
+    parser.add_argument('--cold', action='store_true', help="drop the file cache before the first run")
+    parser.add_argument('--exe', nargs='*', default=None, help="frozen builds to time")
+    args = parser.parse_args()
+
+    measure('script', [sys.executable, os.path.join(ROOT_DIR, 'school_voting.py')],
+            args.runs, args.cold)
+    if args.exe is not None:
+        builds = [(os.path.basename(path), path) for path in args.exe]
+    else:
+        builds = FROZEN_BUILDS
+    for label, path in builds:
+        if os.name == 'nt' and not path.endswith('.exe'):
+            path += '.exe'
+        if os.path.isfile(path):
+            measure(label, [os.path.abspath(path)], args.runs, args.cold)
+        else:
+            print(f"{label:<10} not built ({path})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# Counting speed for ranked-choice elections: generates synthetic ranked
+# ballots (every voter ranks a random-length prefix of a popularity-biased
+# shuffle) and times instant-runoff and multi-seat STV over them.
+#
+#   python benchmarks/bench_stv.py [--ballots 1000000] [--candidates 20] [--seats 3]
+import argparse
+import time
+
+import numpy as np
+
+import common  # noqa: F401  (puts the app on sys.path)
+
+from ranked import RankedBallots, count_stv  # noqa: E402
+
+
+def synthetic_ballots(num_ballots, num_candidates, seed=0):
+    rng = np.random.default_rng(seed)
+    # Gumbel noise over fixed popularities gives weighted random orderings
+    popularity = np.log(rng.dirichlet(np.ones(num_candidates)))
+    keys = popularity + rng.gumbel(size=(num_ballots, num_candidates))
+    prefs = np.argsort(-keys, axis=1).astype(np.int16)
+    lengths = rng.integers(1, num_candidates + 1, size=num_ballots)
+    prefs[np.arange(num_candidates) >= lengths[:, None]] = -1
+    ballots = RankedBallots(num_candidates, capacity=num_ballots)
+    ballots.add_matrix(prefs)
+    return ballots
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ballots', type=int, default=1000000)
+    parser.add_argument('--candidates', type=int, default=20)
+    parser.add_argument('--seats', type=int, default=3)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    ballots = synthetic_ballots(args.ballots, args.candidates)
+    print(f"generated {len(ballots):,} ballots x {args.candidates} candidates "
+          f"in {time.perf_counter() - start:.2f}s "
+          f"({ballots.matrix.nbytes / 1e6:.0f} MB)")
+
+    for seats in (1, args.seats):
+        start = time.perf_counter()
+        outcome = count_stv(ballots, seats)
+        elapsed = time.perf_counter() - start
+        method = "IRV" if seats == 1 else f"STV {seats} seats"
+        print(f"{method:<14} {elapsed:.3f}s  rounds: {len(outcome['rounds'])}  "
+              f"elected: {outcome['elected']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+# Regression suite for the voting app's hot paths on synthetic elections:
+#
+#   cast       ballots/s through cast_vote (toast confirmation) until counted
+#   render     show_voting_interface / show_results as the candidate count grows
+#   images     load_candidate_images with cold and warm thumbnail and image
+#              caches, and the image cache's size across many elections
+#   export     write_results for every results format
+#
+#   python benchmarks/bench_suite.py [--quick] [--output results.json] [--compare baseline.json]
+#
+# Runs headless on Linux by starting Xvfb when there is no $DISPLAY. Results
+# are written as JSON, one record per measurement, and --compare prints the
+# change against an earlier run.
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import ROOT_DIR, make_app, synthetic_ballots, synthetic_election
+
+import thumbnails  # noqa: E402
+
+FULL = {
+    'cast_candidates': 10, 'cast_ballots': 2000,
+    'render_candidates': [10, 50, 200, 500], 'render_repeats': 5,
+    'image_candidates': [10, 100], 'image_elections': 40, 'export_ballots': 200000,
+}
+QUICK = {
+    'cast_candidates': 4, 'cast_ballots': 200,
+    'render_candidates': [10, 50], 'render_repeats': 2,
+    'image_candidates': [10], 'image_elections': 10, 'export_ballots': 20000,
+}
+EXPORT_FORMATS = ['.json', '.csv', '.jsonl', '.svb']
+# Lower is better for these units; --compare flags changes beyond this
+LOWER_IS_BETTER = {'ms', 's', 'bytes'}
+REGRESSION = 0.10
+
+
+class Suite:
+    def __init__(self, directory):
+        self.directory = directory
+        self.results = []
+
+    def record(self, benchmark, metric, value, unit, **params):
+        self.results.append({'benchmark': benchmark, 'params': params, 'metric': metric,
+                             'value': round(value, 3), 'unit': unit})
+        detail = ' '.join(f"{k}={v}" for k, v in params.items())
+        print(f"{benchmark:<8} {metric:<22} {detail:<28} {value:>12,.2f} {unit}")
+
+    def app(self, label):
+        return make_app(os.path.join(self.directory, f"{label}.journal"), confirm_mode='toast')
+
+
+def median_ms(fn, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def bench_cast(suite, config):
+    root, app = suite.app('cast')
+    n = config['cast_candidates']
+    election = synthetic_election(app, "Cast", suite.directory, n)
+    names = election['tally'].names
+    picks = synthetic_ballots(config['cast_ballots'], n)
+    start = time.perf_counter()
+    for idx in picks:
+        app.cast_vote(names[idx])
+        root.update()
+    app.flush_votes()
+    elapsed = time.perf_counter() - start
+    assert election['tally'].total == len(picks)
+    suite.record('cast', 'throughput', len(picks) / elapsed, 'ballots/s', candidates=n)
+    app.on_close()
+
+
+def bench_render(suite, config):
+    root, app = suite.app('render')
+    for n in config['render_candidates']:
+        synthetic_election(app, f"Render {n}", suite.directory, n, ballots=10 * n)
+
+        def voting():
+            app.show_voting_interface()
+            root.update_idletasks()
+
+        suite.record('render', 'show_voting_interface', median_ms(voting, config['render_repeats']),
+                     'ms', candidates=n)
+        app.end_voting()
+
+        def results():
+            app.show_results()
+            root.update_idletasks()
+
+        suite.record('render', 'show_results', median_ms(results, config['render_repeats']),
+                     'ms', candidates=n)
+        root.update()
+    app.on_close()
+
+
+def bench_images(suite, config):
+    root, app = suite.app('images')
+    for n in config['image_candidates']:
+        synthetic_election(app, f"Images {n}", suite.directory, n, image_size=(1200, 1200))
+        for cache in ('cold', 'warm'):
+            if cache == 'cold':
+                shutil.rmtree(thumbnails.THUMBNAIL_DIR, ignore_errors=True)
+                thumbnails._hash_memo.clear()
+                app.images.clear()
+            start = time.perf_counter()
+            app.load_candidate_images()
+            suite.record('images', f"load_candidate_images_{cache}",
+                         (time.perf_counter() - start) * 1000, 'ms', candidates=n)
+    # One long session opening many elections with their own images; the
+    # shared cache stays within its budget however many there are
+    elections = config['image_elections']
+    app.images.budget = 16 << 20
+    for i in range(elections):
+        synthetic_election(app, f"Tabs {i}", os.path.join(suite.directory, f"tabs{i}"), 10)
+    suite.record('images', 'image_cache_size', app.images.size, 'bytes', elections=elections)
+    app.on_close()
+
+
+def bench_export(suite, config):
+    root, app = suite.app('export')
+    ballots = config['export_ballots']
+    synthetic_election(app, "Export", suite.directory, 10, ballots=ballots, status='completed')
+    for ext in EXPORT_FORMATS:
+        path = os.path.join(suite.directory, f"export{ext}")
+        start = time.perf_counter()
+        app.write_results(path)
+        suite.record('export', f"write_results{ext}", (time.perf_counter() - start) * 1000, 'ms',
+                     ballots=ballots)
+        suite.record('export', f"size{ext}", os.path.getsize(path), 'bytes', ballots=ballots)
+    app.on_close()
+
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit,
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {(r['benchmark'], r['metric'], json.dumps(r['params'], sort_keys=True)): r
+                    for r in json.load(f)['results']}
+    regressions = 0
+    print(f"\nCompared with {baseline_path}:")
+    for r in results:
+        old = baseline.get((r['benchmark'], r['metric'], json.dumps(r['params'], sort_keys=True)))
+        if not old or not old['value']:
+            continue
+        change = r['value'] / old['value'] - 1
+        worse = change > REGRESSION if r['unit'] in LOWER_IS_BETTER else change < -REGRESSION
+        regressions += worse
+        print(f"{r['benchmark']:<8} {r['metric']:<22} {change:>+8.1%}{'  REGRESSION' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quick', action='store_true', help="smaller sizes, for a smoke run")
+    parser.add_argument('--only', nargs='*', choices=['cast', 'render', 'images', 'export'])
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+    config = QUICK if args.quick else FULL
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+
+    benches = {'cast': bench_cast, 'render': bench_render, 'images': bench_images,
+               'export': bench_export}
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        # The app keeps its journal, thumbnails and stats under ./elections
+        os.chdir(directory)
+        try:
+            suite = Suite(directory)
+            for name in args.only or benches:
+                benches[name](suite, config)
+        finally:
+            os.chdir(cwd)
+
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': dict(metadata(), config=config), 'results': suite.results}, f, indent=2)
+    print(f"\nWrote {len(suite.results)} results to {output}")
+    if baseline and compare(suite.results, baseline):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# Tab-switch latency with and without the per-election view cache.
+#
+#   python benchmarks/bench_tab_switch.py [--elections 6] [--candidates 10]
+#
+# Needs a display (use xvfb-run on a headless machine).
+import argparse
+import os
+import statistics
+import tempfile
+
+from common import add_election, make_app, make_images, timed
+
+
+def measure(cache_views, args, images, directory):
+    root, app = make_app(os.path.join(directory, f"cache_{cache_views}.journal"))
+    app.cache_views = cache_views
+    for i in range(args.elections):
+        status = 'completed' if i % 2 else 'voting'
+        add_election(app, f"Election {i + 1}", images, status=status, votes=500)
+
+    tabs = app.notebook.tabs()
+    samples = []
+
+    def switch(tab):
+        app.notebook.select(tab)
+        root.update()
+
+    for _ in range(args.rounds):
+        for tab in tabs:
+            samples.append(timed(switch, tab))
+    app.on_close()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--elections', type=int, default=6)
+    parser.add_argument('--candidates', type=int, default=10)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        images = make_images(os.path.join(directory, 'images'), args.candidates)
+        print(f"{'mode':<12}{'switches':>10}{'median ms':>12}{'p95 ms':>10}{'max ms':>10}")
+        for cache_views in (False, True):
+            samples = sorted(measure(cache_views, args, images, directory))
+            p95 = samples[int(len(samples) * 0.95) - 1]
+            label = 'cached' if cache_views else 'rebuild'
+            print(f"{label:<12}{len(samples):>10}{statistics.median(samples) * 1000:>12.2f}"
+                  f"{p95 * 1000:>10.2f}{max(samples) * 1000:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
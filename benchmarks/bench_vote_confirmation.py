@@ -0,0 +1,56 @@
+# Sustained ballots per minute with the modal messagebox vs. the toast overlay.
+#
+#   python benchmarks/bench_vote_confirmation.py [--ballots 200] [--dismiss-ms 700]
+#
+# In modal mode every ballot blocks in messagebox.showinfo until its OK button
+# is pressed; the benchmark presses it --dismiss-ms after it opens, standing in
+# for the voter's extra click. Toast mode needs no dismissal. Needs a display
+# (use xvfb-run on a headless machine).
+import argparse
+import os
+import tempfile
+import time
+
+from common import add_election, make_app, make_images
+
+# Tk's messagebox on X11 is a Tcl dialog named after its parent window
+DISMISS_MESSAGEBOX = 'catch {.__tk__messagebox.ok invoke}'
+
+
+def measure(mode, args, images, directory):
+    root, app = make_app(os.path.join(directory, f"{mode}.journal"))
+    app.confirm_mode = mode
+    election = add_election(app, "Throughput", images)
+    names = election['tally'].names
+
+    start = time.perf_counter()
+    for i in range(args.ballots):
+        if mode == 'modal':
+            root.after(args.dismiss_ms, root.tk.eval, DISMISS_MESSAGEBOX)
+        app.cast_vote(names[i % len(names)])
+        root.update()
+    elapsed = time.perf_counter() - start
+
+    app.flush_votes()
+    assert election['tally'].total == args.ballots
+    app.on_close()
+    return args.ballots / elapsed * 60
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ballots', type=int, default=200)
+    parser.add_argument('--candidates', type=int, default=4)
+    parser.add_argument('--dismiss-ms', type=int, default=700,
+                        help="simulated time for a voter to click OK on the modal dialog")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        images = make_images(os.path.join(directory, 'images'), args.candidates, size=(200, 200))
+        for mode in ('modal', 'toast'):
+            rate = measure(mode, args, images, directory)
+            print(f"{mode:<8}{rate:>12,.0f} ballots/min")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# Helpers shared by the GUI benchmarks: synthetic candidate images, ballots
+# and elections driven through the same SchoolVotingSystem methods the
+# buttons use, and a virtual X display for headless Linux machines.
+import atexit
+import os
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+
+def make_images(directory, count, size=(800, 800)):
+    # Write `count` photo/symbol pairs and return them as a list of tuples
+    from PIL import Image
+
+    os.makedirs(directory, exist_ok=True)
+    pairs = []
+    for i in range(count):
+        color = ((i * 67) % 256, (i * 131) % 256, (i * 29) % 256)
+        photo = os.path.join(directory, f"photo_{i}.png")
+        symbol = os.path.join(directory, f"symbol_{i}.png")
+        if not os.path.exists(photo):
+            Image.new('RGB', size, color).save(photo)
+        if not os.path.exists(symbol):
+            Image.new('RGB', (size[0] // 4, size[1] // 4), color[::-1]).save(symbol)
+        pairs.append((photo, symbol))
+    return pairs
+
+
+def ensure_display():
+    # On Linux without $DISPLAY, start Xvfb for the rest of this process
+    if not sys.platform.startswith('linux') or os.environ.get('DISPLAY'):
+        return
+    xvfb = shutil.which('Xvfb')
+    if xvfb is None:
+        sys.exit("No display: install Xvfb (or run under xvfb-run)")
+    display = f":{os.getpid() % 1000 + 100}"
+    server = subprocess.Popen([xvfb, display, '-screen', '0', '1600x1200x24', '-nolisten', 'tcp'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    atexit.register(server.terminate)
+    os.environ['DISPLAY'] = display
+    for _ in range(50):
+        if os.path.exists(f"/tmp/.X11-unix/X{display[1:]}"):
+            return
+        time.sleep(0.1)
+    sys.exit("Xvfb did not start")
+
+
+def make_app(journal_path, **options):
+    import tkinter as tk
+    from school_voting import SchoolVotingSystem
+
+    # Keep the session snapshot and voted bitmaps beside the benchmark's
+    # journal, away from the real ones under ./elections
+    base = os.path.splitext(journal_path)[0]
+    options.setdefault('session_path', f"{base}.session.json")
+    options.setdefault('voted_dir', f"{base}.voted")
+    ensure_display()
+    root = tk.Tk()
+    app = SchoolVotingSystem(root, journal_path=journal_path, journal_sync='none', **options)
+    root.update()
+    return root, app
+
+
+def synthetic_ballots(count, candidates, seed=0):
+    # Candidate indices with a Zipf-like spread of popularity, so leaderboard
+    # ranks change often early on and then settle, as in a real election
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(candidates)]
+    order = list(range(candidates))
+    rng.shuffle(order)
+    return rng.choices(order, weights=weights, k=count)
+
+
+def synthetic_election(app, name, directory, candidates, ballots=0, status='voting',
+                       image_size=(400, 400), seed=0):
+    # An election with generated images whose ballots go through the ingest
+    # worker into the store, so exports and reloads see them too
+    images = make_images(os.path.join(directory, 'images'), candidates, size=image_size)
+    election = add_election(app, name, images)
+    cast_at = time.time()
+    for idx in synthetic_ballots(ballots, candidates, seed):
+        app.ingest.submit(election, idx, cast_at)
+    app.flush_votes()
+    if status == 'completed':
+        app.end_voting()
+        app.root.update()
+    return election
+
+
+def add_election(app, name, images, status='voting', votes=0):
+    # Walk an election through setup -> registration -> voting (-> completed)
+    app.election_name.set(name)
+    app.num_candidates.set(len(images))
+    app.show_election_setup()
+    setup_tab = app.notebook.nametowidget(app.notebook.tabs()[-1])
+    app.create_election(setup_tab)
+    for i, (entry, (photo, symbol)) in enumerate(zip(app.candidate_entries, images)):
+        entry['name'].insert(0, f"{name} Candidate {i + 1}")
+        entry['photo_path'] = photo
+        entry['symbol_path'] = symbol
+    app.start_voting_process()
+    election = app.elections[name]
+    if votes:
+        tally = election['tally']
+        tally.cast_many_indices(i % len(tally) for i in range(votes))
+    if status == 'completed':
+        app.end_voting()
+    app.root.update()
+    return election
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return time.perf_counter() - start
@@ -0,0 +1,107 @@
+# Bulk candidate registration.
+#
+# Candidates can come from a CSV file with name, photo and symbol columns
+# (relative paths are resolved against the CSV's folder), or from a folder
+# laid out like the app's bundled data:
+#
+#   <folder>/photos/<Candidate Name>.jpg
+#   <folder>/symbols/<Candidate Name>.png
+#
+# validate_candidates() checks the whole list at once and decodes every image
+# in the thumbnail worker pool, which also warms the thumbnail cache, so one
+# error report covers everything before voting starts.
+import csv
+import os
+
+from thumbnails import PHOTO_SIZE, SYMBOL_SIZE, load_thumbnails
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+NAME_COLUMNS = ('name', 'candidate')
+PHOTO_COLUMNS = ('photo', 'photo_path')
+SYMBOL_COLUMNS = ('symbol', 'symbol_path')
+
+
+def read_csv(path):
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        columns = {c.strip().lower(): c for c in reader.fieldnames or ()}
+
+        def column(options):
+            for option in options:
+                if option in columns:
+                    return columns[option]
+            raise ValueError(f"CSV needs one of these columns: {', '.join(options)}")
+
+        name_col = column(NAME_COLUMNS)
+        photo_col = column(PHOTO_COLUMNS)
+        symbol_col = column(SYMBOL_COLUMNS)
+
+        candidates = []
+        for row in reader:
+            candidates.append({
+                'name': (row[name_col] or '').strip(),
+                'photo_path': _resolve(base, row[photo_col]),
+                'symbol_path': _resolve(base, row[symbol_col])
+            })
+    return candidates
+
+
+def read_directory(path):
+    photos = _images_by_name(os.path.join(path, 'photos'))
+    symbols = _images_by_name(os.path.join(path, 'symbols'))
+    if not photos:
+        raise ValueError(f"No candidate photos found in {os.path.join(path, 'photos')}")
+    candidates = []
+    for name in sorted(photos):
+        candidates.append({
+            'name': name,
+            'photo_path': photos[name],
+            'symbol_path': symbols.get(name)
+        })
+    return candidates
+
+
+def validate_candidates(candidates, max_workers=None):
+    # Returns a list of error messages; empty means every candidate is usable
+    errors = []
+    seen = set()
+    requests = []
+    owners = []
+    for idx, candidate in enumerate(candidates):
+        label = f"Candidate {idx+1}" + (f" ({candidate['name']})" if candidate['name'] else "")
+        if not candidate['name']:
+            errors.append(f"{label}: missing name")
+        elif candidate['name'] in seen:
+            errors.append(f"{label}: name is used more than once")
+        seen.add(candidate['name'])
+        for key, size, what in (('photo_path', PHOTO_SIZE, 'photo'),
+                                ('symbol_path', SYMBOL_SIZE, 'symbol')):
+            if not candidate.get(key):
+                errors.append(f"{label}: missing {what}")
+            else:
+                requests.append((candidate[key], size))
+                owners.append((label, what))
+
+    for (label, what), result in zip(owners, load_thumbnails(requests, max_workers=max_workers)):
+        if isinstance(result, Exception):
+            errors.append(f"{label}: cannot load {what}: {result}")
+    return errors
+
+
+def _resolve(base, value):
+    value = (value or '').strip()
+    if not value:
+        return None
+    return value if os.path.isabs(value) else os.path.join(base, value)
+
+
+def _images_by_name(directory):
+    if not os.path.isdir(directory):
+        return {}
+    images = {}
+    for entry in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(entry)
+        if ext.lower() in IMAGE_EXTENSIONS:
+            images.setdefault(stem, os.path.join(directory, entry))
+    return images
@@ -0,0 +1,439 @@
+# Multi-booth vote collection over TCP.
+#
+# One VoteCollector (run with `python collector.py`) keeps the combined tally
+# for every election; each booth streams its votes to it through a
+# BoothConnection and gets the merged results pushed back.
+#
+# The protocol is newline-delimited JSON. Every vote carries the booth id, a
+# per-run session id and a sequence number; the collector remembers the last
+# sequence number applied per (booth, session), so batches that are resent
+# after a dropped connection are acknowledged but never counted twice. A
+# session the collector has no record of (a booth that just started, or one
+# whose votes the collector lost) starts at whatever sequence number it sends
+# first, since the booth drops votes from its queue once they are acknowledged.
+#
+# With a journal, registrations and counted batches are appended to it and
+# fsynced before the ack goes out, so an acknowledged vote survives a collector
+# restart; the journal is replayed on start.
+#
+# Each booth registers its elections before sending votes for them. Candidate
+# indices are the booth's own; a booth that lists the same candidates in
+# another order has its indices mapped by name, and one with different
+# candidates is refused. A booth only sends votes for an election once its
+# registration is accepted, and holds them otherwise (they stay in its own
+# journal), so a refused booth's votes are never counted against another
+# booth's list.
+#
+#   booth -> collector
+#     {"type": "election", "booth": id, "session": s, "election": name,
+#      "candidates": [names]}
+#     {"type": "votes", "booth": id, "session": s, "first_seq": n,
+#      "votes": [[election, candidate_idx], ...]}
+#     {"type": "results", "election": name}
+#   collector -> booth
+#     {"type": "registered", "election": name}
+#     {"type": "ack", "booth": id, "session": s, "seq": last applied,
+#      "resend": true if a gap was detected}
+#     {"type": "results", "election": name, "votes": {...}, "total_votes": n}
+#     {"type": "error", "message": text, "election": name if a registration
+#      was refused}
+import argparse
+import asyncio
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict, deque
+
+from ballots import BallotLog, now
+from journal import VoteJournal, read_records
+from tally import Tally
+
+DEFAULT_PORT = 8765
+JOURNAL_PATH = os.path.join('elections', 'collector.journal')
+LINE_LIMIT = 1 << 20  # results for large elections exceed asyncio's 64 KiB default
+
+
+def encode(message):
+    return (json.dumps(message, separators=(',', ':')) + '\n').encode('utf-8')
+
+
+def results_message(name, tally):
+    return {'type': 'results', 'election': name,
+            'votes': tally.votes(), 'total_votes': tally.total}
+
+
+class VoteCollector:
+    def __init__(self, push_interval=0.5, journal_path=None):
+        self.push_interval = push_interval
+        self.elections = OrderedDict()  # name -> Tally, same model as the booths
+        self.ballots = {}  # name -> BallotLog with the booth of every ballot
+        self.last_seq = {}  # (booth, session) -> last applied sequence number
+        # (booth, session) -> {election: booth candidate index -> collector index}
+        self.registrations = {}
+        self.clients = set()
+        self.changed = set()
+        self.server = None
+        self._pusher = None
+        self.journal = None
+        if journal_path is not None:
+            self.replay(journal_path)
+            # Synced explicitly before every reply, see handle()
+            self.journal = VoteJournal(journal_path, max_delay=None)
+
+    async def start(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self.server = await asyncio.start_server(self.handle, host, port, limit=LINE_LIMIT)
+        self._pusher = asyncio.create_task(self.push_loop())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._pusher.cancel()
+        self.server.close()
+        for writer in list(self.clients):
+            writer.close()
+        await self.server.wait_closed()
+        if self.journal is not None:
+            self.journal.close()
+
+    def replay(self, path):
+        for record in read_records(path):
+            op = record['op']
+            if op == 'election':
+                self._add_election(record['election'], record['candidates'])
+            elif op == 'registered':
+                self._register((record['booth'], record['session']), record['election'],
+                               record['mapping'])
+            elif op == 'votes':
+                self._count((record['booth'], record['session']), record['votes'],
+                            record['seq'], record['t'])
+        self.changed.clear()
+
+    def _record(self, record):
+        if self.journal is not None:
+            self.journal.append(record)
+
+    async def handle(self, reader, writer):
+        self.clients.add(writer)
+        try:
+            async for line in reader:
+                try:
+                    reply = self.dispatch(json.loads(line))
+                except (ValueError, KeyError, TypeError) as e:
+                    reply = {'type': 'error', 'message': str(e)}
+                if self.journal is not None:
+                    # Whatever this message changed is on disk before the
+                    # booth hears about it
+                    await asyncio.get_running_loop().run_in_executor(None, self.journal.sync)
+                if reply is not None:
+                    writer.write(encode(reply))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.clients.discard(writer)
+            writer.close()
+
+    def dispatch(self, message):
+        kind = message['type']
+        if kind == 'votes':
+            return self.apply_votes(message)
+        if kind == 'election':
+            return self.register_election((message['booth'], message['session']),
+                                          message['election'], message['candidates'])
+        if kind == 'results':
+            return results_message(message['election'], self.elections[message['election']])
+        raise ValueError(f"Unknown message type: {kind}")
+
+    def register_election(self, key, name, candidates):
+        candidates = list(candidates)
+        tally = self.elections.get(name)
+        if tally is None:
+            tally = self._add_election(name, candidates)
+            self._record({'op': 'election', 'election': name, 'candidates': candidates})
+        if tally.names == candidates:
+            mapping = list(range(len(candidates)))
+        elif sorted(tally.names) == sorted(candidates) and len(set(candidates)) == len(candidates):
+            mapping = [tally.index[c] for c in candidates]
+        else:
+            mapping = None
+        if self.registrations.get(key, {}).get(name) != mapping:
+            self._register(key, name, mapping)
+            self._record({'op': 'registered', 'booth': key[0], 'session': key[1],
+                          'election': name, 'mapping': mapping})
+        if mapping is None:
+            return {'type': 'error', 'election': name,
+                    'message': f"Election '{name}' is registered with different candidates"}
+        return {'type': 'registered', 'election': name}
+
+    def _add_election(self, name, candidates):
+        tally = self.elections[name] = Tally(candidates)
+        self.ballots[name] = BallotLog()
+        return tally
+
+    def _register(self, key, name, mapping):
+        # mapping None: the booth's registration was refused
+        if mapping is None:
+            self.registrations.get(key, {}).pop(name, None)
+        else:
+            self.registrations.setdefault(key, {})[name] = mapping
+
+    def apply_votes(self, message):
+        key = (message['booth'], message['session'])
+        first = message['first_seq']
+        votes = message['votes']
+        # An unknown session starts where the booth does; its earlier votes
+        # were acknowledged by a collector that didn't keep them
+        last = self.last_seq.get(key, first - 1)
+        if first > last + 1:
+            # A gap means an earlier batch was lost; ask for everything after
+            # the last applied vote again
+            return {'type': 'ack', 'booth': key[0], 'session': key[1], 'seq': last,
+                    'resend': True}
+
+        new_votes = votes[last + 1 - first:]
+        registered = self.registrations.get(key, {})
+        by_election = {}
+        for name, idx in new_votes:
+            if name not in registered:
+                raise KeyError(f"Election not registered by this booth: {name}")
+            by_election.setdefault(name, []).append(idx)
+        # Validate everything before counting anything so a bad batch is
+        # rejected as a whole
+        for name, indices in by_election.items():
+            mapping = registered[name]
+            if any(not 0 <= idx < len(mapping) for idx in indices):
+                raise ValueError(f"Candidate index out of range in '{name}'")
+            by_election[name] = [mapping[idx] for idx in indices]
+        last = max(last, first + len(votes) - 1)
+        if by_election or self.last_seq.get(key) != last:
+            t = now()
+            self._count(key, by_election, last, t)
+            self._record({'op': 'votes', 'booth': key[0], 'session': key[1], 'seq': last,
+                          't': t, 'votes': by_election})
+        return {'type': 'ack', 'booth': key[0], 'session': key[1], 'seq': last}
+
+    def _count(self, key, by_election, last, t):
+        # by_election: name -> collector candidate indices
+        for name, indices in by_election.items():
+            self.elections[name].cast_many_indices(indices)
+            self.ballots[name].extend(indices, booth=key[0], t=t)
+            self.changed.add(name)
+        self.last_seq[key] = last
+
+    async def push_loop(self):
+        # Broadcast merged results for elections that changed, at most once
+        # per push_interval however many batches arrived
+        while True:
+            await asyncio.sleep(self.push_interval)
+            if not self.changed or not self.clients:
+                continue
+            changed, self.changed = self.changed, set()
+            payload = b''.join(encode(results_message(name, self.elections[name]))
+                               for name in changed)
+            for writer in list(self.clients):
+                try:
+                    writer.write(payload)
+                except ConnectionError:
+                    self.clients.discard(writer)
+
+
+class BoothConnection:
+    # Streams one booth's votes to the collector. submit() must be called on
+    # the event loop's thread; run() keeps (re)connecting until close().
+    def __init__(self, host, port, booth_id, batch_size=100, batch_delay=0.05,
+                 reconnect_delay=1.0):
+        self.host = host
+        self.port = port
+        self.booth_id = booth_id
+        self.session = uuid.uuid4().hex
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.reconnect_delay = reconnect_delay
+        self.elections = OrderedDict()  # name -> candidate names
+        self.accepted = set()  # elections the collector accepted the registration of
+        self.held = {}  # election -> candidate indices waiting for that
+        self.rejected = {}  # election -> why the collector refused it
+        self.unacked = deque()  # (seq, election, candidate_idx)
+        self.next_seq = 1
+        self.acked_seq = 0
+        self.sent_seq = 0
+        self.results = {}  # election -> latest results message from the collector
+        self.errors = []
+        self._wakeup = asyncio.Event()
+        self._acked = asyncio.Event()
+        self._closed = False
+        self._writer = None
+
+    def register_election(self, name, candidates):
+        if self.elections.get(name) != list(candidates):
+            self.accepted.discard(name)
+        self.elections[name] = list(candidates)
+        if self._writer is not None:
+            self._writer.write(self._election_message(name))
+
+    def submit(self, election, candidate_idx):
+        if election not in self.accepted:
+            self.held.setdefault(election, []).append(candidate_idx)
+            return
+        self.unacked.append((self.next_seq, election, candidate_idx))
+        self.next_seq += 1
+        self._wakeup.set()
+
+    def _election_message(self, name):
+        return encode({'type': 'election', 'booth': self.booth_id, 'session': self.session,
+                       'election': name, 'candidates': self.elections[name]})
+
+    async def drain(self):
+        # Wait until the collector has acknowledged every submitted vote, or
+        # refused the election it was for
+        while (self.acked_seq < self.next_seq - 1
+               or any(name not in self.rejected for name in self.held)):
+            self._acked.clear()
+            await self._acked.wait()
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        if self._writer is not None:
+            self._writer.close()
+
+    async def run(self):
+        while not self._closed:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port,
+                                                               limit=LINE_LIMIT)
+            except OSError:
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            self._writer = writer
+            for name in self.elections:
+                writer.write(self._election_message(name))
+            sender = asyncio.create_task(self._send_loop(writer))
+            try:
+                await self._read_loop(reader)
+            except ConnectionError:
+                pass
+            finally:
+                sender.cancel()
+                self._writer = None
+                writer.close()
+            if not self._closed:
+                await asyncio.sleep(self.reconnect_delay)
+
+    async def _send_loop(self, writer):
+        # Everything not yet acknowledged is (re)sent on a fresh connection
+        self.sent_seq = self.acked_seq
+        self._wakeup.set()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self._closed:
+                return
+            await asyncio.sleep(self.batch_delay)
+            while self.unacked and self.unacked[-1][0] > self.sent_seq:
+                start = max(0, self.sent_seq - self.unacked[0][0] + 1)
+                batch = [self.unacked[i] for i in range(start, min(start + self.batch_size,
+                                                                   len(self.unacked)))]
+                writer.write(encode({'type': 'votes', 'booth': self.booth_id,
+                                     'session': self.session, 'first_seq': batch[0][0],
+                                     'votes': [[e, idx] for _, e, idx in batch]}))
+                self.sent_seq = batch[-1][0]
+                await writer.drain()
+
+    async def _read_loop(self, reader):
+        async for line in reader:
+            message = json.loads(line)
+            kind = message['type']
+            if kind == 'ack':
+                seq = message['seq']
+                while self.unacked and self.unacked[0][0] <= seq:
+                    self.unacked.popleft()
+                self.acked_seq = max(self.acked_seq, seq)
+                self._acked.set()
+                if message.get('resend'):
+                    self.sent_seq = min(self.sent_seq, seq)
+                    self._wakeup.set()
+            elif kind == 'registered':
+                name = message['election']
+                self.accepted.add(name)
+                self.rejected.pop(name, None)
+                for idx in self.held.pop(name, ()):
+                    self.submit(name, idx)
+                self._acked.set()
+            elif kind == 'results':
+                self.results[message['election']] = message
+            elif kind == 'error':
+                self.errors.append(message['message'])
+                if 'election' in message:
+                    self.accepted.discard(message['election'])
+                    self.rejected[message['election']] = message['message']
+                    self._acked.set()
+
+
+class BoothClient:
+    # Thread-safe wrapper for the GUI: runs a BoothConnection on its own event
+    # loop thread so network stalls never reach the Tk main loop
+    def __init__(self, host, port, booth_id, **options):
+        self.loop = asyncio.new_event_loop()
+        self.connection = None
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.connection = BoothConnection(host, port, booth_id, **options)
+            ready.set()
+            self.loop.run_until_complete(self.connection.run())
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        ready.wait()
+
+    @property
+    def results(self):
+        return self.connection.results
+
+    @property
+    def rejected(self):
+        return self.connection.rejected
+
+    def register_election(self, name, candidates):
+        self.loop.call_soon_threadsafe(self.connection.register_election, name, list(candidates))
+
+    def submit(self, election, candidate_idx):
+        self.loop.call_soon_threadsafe(self.connection.submit, election, candidate_idx)
+
+    def close(self, timeout=2.0):
+        # Give unacknowledged votes a moment to get through, then stop
+        future = asyncio.run_coroutine_threadsafe(
+            asyncio.wait_for(self.connection.drain(), timeout), self.loop)
+        try:
+            future.result(timeout + 1)
+        except Exception:
+            pass
+        self.loop.call_soon_threadsafe(self.connection.close)
+        self.thread.join(timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect votes from several voting booths")
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--push-interval', type=float, default=0.5)
+    parser.add_argument('--journal', default=JOURNAL_PATH,
+                        help="where counted votes are kept across restarts")
+    args = parser.parse_args()
+
+    async def serve():
+        collector = VoteCollector(push_interval=args.push_interval, journal_path=args.journal)
+        port = await collector.start(args.host, args.port)
+        print(f"Collecting votes on {args.host}:{port}", flush=True)
+        await collector.server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+# Streaming export of ballot-level results.
+#
+# Ballots are consumed from an iterator and written as they arrive, so the
+# memory used is the same for a hundred ballots or ten million. Every format
+# carries the same three kinds of record, and read_export() streams them back:
+#
+#   {'type': 'election', 'election': name, 'date': ..., 'candidates': [names],
+#    'ballot_type': 'single' or 'ranked', 'seats': n}
+#   {'type': 'ballot', 'ballot': n, 'candidate_index': i, 'candidate': name,
+#    'cast_at': unix time or None}
+#   {'type': 'total', 'candidate_index': i, 'candidate': name, 'votes': n}
+#   {'type': 'audit', 'ballots': n, 'merkle_root': hex}
+#
+# Ranked ballots are exported under their first choice, so the ballot type is
+# kept to tell readers the totals are first preferences.
+#
+# The audit record holds the Merkle root of the exported ballots, computed
+# while they are written (see audit.py for checking a file against it).
+#
+# Formats (picked from the file extension):
+#   .csv   - one row per record, blank cells for fields a record doesn't have;
+#            the election row's candidates cell holds a JSON list
+#   .jsonl - one JSON object per line
+#   .svb   - compact binary: a JSON header, then ballots in columnar chunks
+#            (uint32 candidate indices followed by float64 timestamps), then a
+#            JSON trailer with the totals and the audit fields
+import csv
+import json
+import math
+import os
+import struct
+from array import array
+from datetime import datetime
+from itertools import islice
+
+from audit import MerkleLog
+
+FORMATS = ('.csv', '.jsonl', '.svb')
+CSV_FIELDS = ['type', 'election', 'ballot', 'candidate_index', 'candidate', 'cast_at', 'votes',
+              'merkle_root', 'date', 'candidates', 'ballot_type', 'seats']
+BINARY_MAGIC = b'SVB1'
+CHUNK_SIZE = 65536
+
+
+def export_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported export format: {ext or path}")
+    return ext
+
+
+def export_results(path, name, tally, ballots, ballot_type='single', seats=1):
+    # ballots: iterable of (candidate_index, cast_at) in cast order.
+    # Returns the number of ballots written.
+    header = {
+        'type': 'election',
+        'election': name,
+        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'candidates': list(tally.names),
+        'ballot_type': ballot_type,
+        'seats': seats
+    }
+    writer = {'.csv': _write_csv, '.jsonl': _write_jsonl, '.svb': _write_binary}[export_format(path)]
+    audit = MerkleLog()
+    tmp = path + '.tmp'
+    try:
+        count = writer(tmp, header, tally, audit.tee(ballots), audit)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
+
+
+def read_export(path):
+    reader = {'.csv': _read_csv, '.jsonl': _read_jsonl, '.svb': _read_binary}[export_format(path)]
+    return reader(path)
+
+
+def _ballot_records(tally, ballots):
+    names = tally.names
+    for n, (idx, cast_at) in enumerate(ballots, 1):
+        yield {'type': 'ballot', 'ballot': n, 'candidate_index': idx,
+               'candidate': names[idx], 'cast_at': cast_at}
+
+
+def _total_records(tally):
+    for idx, name in enumerate(tally.names):
+        yield {'type': 'total', 'candidate_index': idx, 'candidate': name,
+               'votes': tally.counts[idx]}
+
+
+def _audit_record(audit):
+    return {'type': 'audit', 'ballots': audit.size, 'merkle_root': audit.root_hex()}
+
+
+def _write_csv(path, header, tally, ballots, audit):
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        writer.writerow({'type': 'election', 'election': header['election'],
+                         'date': header['date'], 'candidates': json.dumps(header['candidates']),
+                         'ballot_type': header['ballot_type'], 'seats': header['seats']})
+        for record in _ballot_records(tally, ballots):
+            record['election'] = header['election']
+            writer.writerow(record)
+            count += 1
+        for record in _total_records(tally):
+            record['election'] = header['election']
+            writer.writerow(record)
+        writer.writerow({'type': 'audit', 'election': header['election'], 'ballot': audit.size,
+                         'merkle_root': audit.root_hex()})
+    return count
+
+
+def _write_jsonl(path, header, tally, ballots, audit):
+    count = 0
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(dumps(header) + '\n')
+        for record in _ballot_records(tally, ballots):
+            f.write(dumps(record) + '\n')
+            count += 1
+        for record in _total_records(tally):
+            f.write(dumps(record) + '\n')
+        f.write(dumps(_audit_record(audit)) + '\n')
+    return count
+
+
+def _write_binary(path, header, tally, ballots, audit):
+    count = 0
+    ballots = iter(ballots)
+    with open(path, 'wb') as f:
+        f.write(BINARY_MAGIC)
+        _write_blob(f, header)
+        while True:
+            chunk = list(islice(ballots, CHUNK_SIZE))
+            if not chunk:
+                break
+            indices = array('I', (idx for idx, _ in chunk))
+            stamps = array('d', (math.nan if t is None else t for _, t in chunk))
+            f.write(struct.pack('<I', len(chunk)))
+            _write_array(f, indices)
+            _write_array(f, stamps)
+            count += len(chunk)
+        f.write(struct.pack('<I', 0))
+        _write_blob(f, {'votes': list(tally.counts), 'ballots': audit.size,
+                        'merkle_root': audit.root_hex()})
+    return count
+
+
+def _read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            kind = row['type']
+            if kind == 'election':
+                if 'candidates' in row:
+                    yield {'type': 'election', 'election': row['election'], 'date': row['date'],
+                           'candidates': json.loads(row['candidates']),
+                           'ballot_type': row.get('ballot_type') or 'single',
+                           'seats': int(row.get('seats') or 1)}
+                else:
+                    # Written before the date and candidates columns existed
+                    yield {'type': 'election', 'election': row['election'],
+                           'date': row['cast_at']}
+            elif kind == 'ballot':
+                yield {'type': 'ballot', 'ballot': int(row['ballot']),
+                       'candidate_index': int(row['candidate_index']),
+                       'candidate': row['candidate'],
+                       'cast_at': float(row['cast_at']) if row['cast_at'] else None}
+            elif kind == 'total':
+                yield {'type': 'total', 'candidate_index': int(row['candidate_index']),
+                       'candidate': row['candidate'], 'votes': int(row['votes'])}
+            elif kind == 'audit':
+                yield {'type': 'audit', 'ballots': int(row['ballot']),
+                       'merkle_root': row['merkle_root']}
+
+
+def _read_jsonl(path):
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _read_binary(path):
+    with open(path, 'rb') as f:
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError(f"Not a results file: {path}")
+        header = _read_blob(f)
+        yield header
+        names = header['candidates']
+        n = 0
+        while True:
+            (size,) = struct.unpack('<I', f.read(4))
+            if not size:
+                break
+            indices = _read_array(f, 'I', size)
+            stamps = _read_array(f, 'd', size)
+            for idx, t in zip(indices, stamps):
+                n += 1
+                yield {'type': 'ballot', 'ballot': n, 'candidate_index': idx,
+                       'candidate': names[idx], 'cast_at': None if math.isnan(t) else t}
+        trailer = _read_blob(f)
+        for idx, votes in enumerate(trailer['votes']):
+            yield {'type': 'total', 'candidate_index': idx, 'candidate': names[idx],
+                   'votes': votes}
+        if 'merkle_root' in trailer:
+            yield {'type': 'audit', 'ballots': trailer['ballots'],
+                   'merkle_root': trailer['merkle_root']}
+
+
+def _write_blob(f, obj):
+    data = json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    f.write(struct.pack('<I', len(data)))
+    f.write(data)
+
+
+def _read_blob(f):
+    (size,) = struct.unpack('<I', f.read(4))
+    return json.loads(f.read(size))
+
+
+def _write_array(f, values):
+    # The file is little-endian whatever machine wrote it
+    if struct.pack('=I', 1) != struct.pack('<I', 1):
+        values = array(values.typecode, values)
+        values.byteswap()
+    values.tofile(f)
+
+
+def _read_array(f, typecode, size):
+    values = array(typecode)
+    values.fromfile(f, size)
+    if struct.pack('=I', 1) != struct.pack('<I', 1):
+        values.byteswap()
+    return values
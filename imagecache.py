@@ -0,0 +1,141 @@
+# Shared, memory-budgeted cache of candidate PhotoImages.
+#
+# Images are keyed by (file, size), so a symbol used by several elections is
+# decoded and held once. Each entry remembers which elections ("owners") use
+# it. When the total size goes over the budget, the least recently used
+# images are dropped, skipping any the visible election still needs; an
+# owner that lost images is marked stale so the app can refill its cards
+# with reloaded ones when its tab is shown again.
+#
+# Elections only hold keys, never the PhotoImages, so an evicted image is
+# really freed. Tk labels still showing it go blank, which is harmless for a
+# hidden tab. Size is counted as width * height * 4, what Tk keeps per image.
+import os
+from collections import OrderedDict
+
+from thumbnails import load_thumbnails
+
+
+def image_key(path, size):
+    return (os.path.abspath(path), tuple(size))
+
+
+class ImageCache:
+    def __init__(self, budget_bytes, make_photo=None):
+        # make_photo(PIL image) -> PhotoImage; ImageTk.PhotoImage by default
+        self.budget = budget_bytes
+        self.make_photo = make_photo
+        self.entries = OrderedDict()  # key -> [photo, bytes, owners], oldest first
+        self.size = 0
+        self.active = None
+        self.stale = set()
+        self.failed = set()  # keys whose file could not be read; not retried by get()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self, requests, owner):
+        # requests: (path, size) pairs. Returns the key for every request
+        # (None without a path) and {key: exception} for those that could
+        # not be loaded; get() shows no image for those. Misses, including
+        # earlier failures, are decoded together in the thumbnail pool.
+        keys = [image_key(path, size) if path else None for path, size in requests]
+        missing = OrderedDict()
+        for key, request in zip(keys, requests):
+            if key is None:
+                continue
+            entry = self.entries.get(key)
+            if entry is None:
+                missing.setdefault(key, request)
+            else:
+                self.hits += 1
+                entry[2].add(owner)
+                self.entries.move_to_end(key)
+        errors = {}
+        if missing:
+            images = load_thumbnails(missing.values())
+            for key, img in zip(missing, images):
+                if isinstance(img, Exception):
+                    errors[key] = img
+                    self.failed.add(key)
+                else:
+                    self.failed.discard(key)
+                    self._add(key, img, owner)
+        self.trim()
+        return keys, errors
+
+    def get(self, key, owner):
+        # The PhotoImage for a key from load(), reloading it if it has been
+        # evicted since. None if there is no image or it can't be read.
+        if key is None or key in self.failed:
+            return None
+        entry = self.entries.get(key)
+        if entry is None:
+            img = load_thumbnails([(key[0], key[1])])[0]
+            if isinstance(img, Exception):
+                self.failed.add(key)
+                return None
+            entry = self._add(key, img, owner)
+            self.trim()
+        else:
+            self.hits += 1
+            entry[2].add(owner)
+            self.entries.move_to_end(key)
+        return entry[0]
+
+    def activate(self, owner):
+        # owner's tab is now the one on screen; its images are kept even
+        # over budget. Returns True if some of them were evicted while it
+        # was hidden, i.e. its cards need refilling.
+        self.active = owner
+        was_stale = owner in self.stale
+        self.stale.discard(owner)
+        self.trim()
+        return was_stale
+
+    def release(self, owner):
+        # owner is gone (its tab was closed); drop the images nothing else uses
+        for key in list(self.entries):
+            owners = self.entries[key][2]
+            owners.discard(owner)
+            if not owners:
+                self._evict(key)
+        self.stale.discard(owner)
+        if self.active == owner:
+            self.active = None
+
+    def trim(self):
+        if self.size <= self.budget:
+            return
+        for key in list(self.entries):
+            if self.active in self.entries[key][2]:
+                continue
+            self._evict(key)
+            if self.size <= self.budget:
+                return
+
+    def clear(self):
+        for key in list(self.entries):
+            self._evict(key)
+
+    def stats(self):
+        return {'images': len(self.entries), 'bytes': self.size, 'budget': self.budget,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def _add(self, key, img, owner):
+        if self.make_photo is None:
+            # Imported here so startup doesn't load PIL before any image is shown
+            from PIL import ImageTk
+            self.make_photo = ImageTk.PhotoImage
+        self.misses += 1
+        width, height = img.size
+        entry = [self.make_photo(img), width * height * 4, {owner}]
+        self.entries[key] = entry
+        self.size += entry[1]
+        return entry
+
+    def _evict(self, key):
+        photo, size, owners = self.entries.pop(key)
+        self.size -= size
+        self.evictions += 1
+        self.stale.update(owners)
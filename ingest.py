@@ -0,0 +1,85 @@
+# Background vote ingest.
+#
+# Vote buttons only put the ballot on a queue. A worker thread takes ballots
+# off in batches and writes them to the store, then hands each written batch
+# back; the Tk thread collects those with take_written() from a root.after
+# poll and does the counting there, so tallies are only ever touched by the
+# Tk thread and a slow disk can't stall the voting screen.
+#
+# Consistency model:
+#   - A ballot is confirmed to the voter as soon as it is queued.
+#   - A ballot is counted only after the store has accepted it, so the counts
+#     on screen never include a vote that is missing from the log. They trail
+#     the queue by at most a poll interval plus one batch.
+#   - Ballots are written and counted in the order they were cast.
+#   - drain() waits for everything queued so far to be written. The app calls
+#     it before ending voting, exporting, discarding an election or closing,
+#     so final results, exports and the log all hold every confirmed ballot.
+#   - Ballots still queued when the process dies are lost, like those inside
+#     the store's group-commit window.
+import queue
+import threading
+from collections import deque
+
+_STOP = object()
+
+
+class IngestWorker:
+    def __init__(self, store, batch_size=500):
+        self.store = store
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._written = deque()  # batches the store accepted, waiting to be counted
+        self.errors = deque()  # (ballot, exception) the store refused
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, election, candidate_idx, cast_at, ranking=None):
+        # election is the app's election dict; it travels with the ballot so
+        # counting goes to the right election whatever happens to the tabs
+        self._queue.put((election, candidate_idx, cast_at, ranking))
+
+    def take_written(self):
+        # Every ballot written since the last call, in cast order
+        ballots = []
+        while self._written:
+            ballots.extend(self._written.popleft())
+        return ballots
+
+    def idle(self):
+        # True when every queued ballot has been written
+        return self._queue.unfinished_tasks == 0
+
+    def drain(self):
+        self._queue.join()
+
+    def close(self):
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in batch
+            written = []
+            for ballot in batch:
+                if ballot is _STOP:
+                    continue
+                election, candidate_idx, cast_at, ranking = ballot
+                try:
+                    self.store.log_vote(election['name'], candidate_idx, cast_at, ranking=ranking)
+                except Exception as e:
+                    self.errors.append((ballot, e))
+                else:
+                    written.append(ballot)
+            if written:
+                self._written.append(written)
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
@@ -0,0 +1,348 @@
+# Append-only, crash-safe journal of election events.
+#
+# Every change to an election (creation, candidate registration, each vote,
+# status changes) is written as one JSON line. Writes are buffered and made
+# durable with group commit: one fsync covers every record appended since the
+# previous one, so a burst of clicks costs a single disk flush.
+#
+# Durability modes:
+#   'always' - fsync after every record (nothing lost, slowest)
+#   'batch'  - fsync once max_pending records are waiting or max_delay seconds
+#              after the oldest unsynced record, whichever comes first
+#   'none'   - leave flushing to the OS (fastest, loses votes on power loss)
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from tally import Tally
+
+SYNC_MODES = ('always', 'batch', 'none')
+
+
+class VoteJournal:
+    def __init__(self, path, sync='batch', max_delay=0.25, max_pending=100):
+        if sync not in SYNC_MODES:
+            raise ValueError(f"Unknown sync mode: {sync}")
+        self.path = path
+        self.sync_mode = sync
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        _truncate_torn_tail(path)
+        self._file = open(path, 'a', encoding='utf-8')
+        # name -> byte offset of the record that created the election, so a
+        # tab opened later only reads the journal from there
+        self.starts = {}
+        self._saved = {}
+
+        self._flusher = None
+        if sync == 'batch' and max_delay is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def load_elections(self, snapshot=None):
+        # With a session snapshot (see session.py) only the journal after it
+        # is replayed; elections it doesn't touch come back with candidates
+        # and tally None until load_election() is called for them
+        self._saved = {}
+        self.starts = {}
+        if snapshot is None or not self._snapshot_matches(snapshot):
+            return replay(self.path, starts=self.starts)
+        self.starts.update(snapshot['journal_starts'])
+        elections = OrderedDict()
+        for name, saved in snapshot['elections'].items():
+            elections[name] = {
+                'name': name,
+                'ballot_type': saved['ballot_type'],
+                'seats': saved['seats'],
+                'status': saved['status'],
+                'candidates': None,
+                'tally': None
+            }
+            self._saved[name] = saved
+        return replay(self.path, snapshot['journal_offset'], elections, self._load_saved,
+                      self.starts)
+
+    def load_election(self, name):
+        return self._load_saved(name)
+
+    def position(self):
+        # Journal size including everything appended so far, for snapshots
+        with self._lock:
+            self._file.flush()
+            return os.fstat(self._file.fileno()).st_size
+
+    def election_starts(self):
+        return dict(self.starts)
+
+    def iter_ballots(self, name):
+        # (candidate_index, cast_at) for the current incarnation of `name`,
+        # streamed from disk
+        return ((idx, t) for idx, t, _ in self.iter_votes(name))
+
+    def iter_votes(self, name):
+        # (candidate_index, cast_at, ranking or None) in one pass
+        self.sync()
+        return ((r['candidate'], r.get('t'), r.get('ranking'))
+                for r in read_votes(self.path, name, self.starts.get(name)))
+
+    # Record helpers
+
+    def log_election(self, name, ballot_type='single', seats=1):
+        # Votes from the ingest thread may land between position() and the
+        # record; read_votes() skips anything before the record itself
+        start = self.position()
+        self.append({'op': 'election', 'election': name,
+                     'ballot_type': ballot_type, 'seats': seats})
+        self.starts[name] = start
+
+    def log_candidates(self, name, candidates):
+        self.append({'op': 'candidates', 'election': name, 'candidates': candidates})
+
+    def log_status(self, name, status):
+        self.append({'op': 'status', 'election': name, 'status': status})
+
+    def log_discard(self, name):
+        self.append({'op': 'discard', 'election': name})
+        self.starts.pop(name, None)
+
+    def log_vote(self, name, candidate_idx, cast_at=None, ranking=None):
+        # Ranked ballots are logged under their first choice with the full
+        # ranking alongside
+        record = {'op': 'vote', 'election': name, 'candidate': candidate_idx,
+                  't': round(time.time() if cast_at is None else cast_at, 3)}
+        if ranking is not None:
+            record['ranking'] = ranking
+        self.append(record)
+
+    def append(self, record):
+        line = json.dumps(record, separators=(',', ':')) + '\n'
+        with self._lock:
+            if self._closed:
+                raise ValueError("Journal is closed")
+            self._file.write(line)
+            self.pending += 1
+            if self.sync_mode == 'always' or (
+                    self.sync_mode == 'batch' and self.pending >= self.max_pending):
+                self._sync_locked()
+            elif self.sync_mode == 'batch' and self.pending == 1:
+                self._dirty.set()
+
+    def sync(self):
+        with self._lock:
+            if not self._closed:
+                self._sync_locked()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._sync_locked()
+            self._closed = True
+            self._file.close()
+        self._dirty.set()
+        if self._flusher is not None:
+            self._flusher.join()
+
+    def _snapshot_matches(self, snapshot):
+        # The snapshot must be of this journal, end on a record boundary
+        # inside it, and carry counts for every election
+        offset = snapshot.get('journal_offset')
+        if snapshot.get('journal') != os.path.abspath(self.path) or offset is None:
+            return False
+        starts = snapshot.get('journal_starts')
+        if not isinstance(starts, dict) or not all(name in starts for name in snapshot['elections']):
+            return False
+        if any(saved.get('tally') is None for saved in snapshot['elections'].values()):
+            return False
+        if offset == 0:
+            return True
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(offset - 1)
+                return f.read(1) == b'\n'
+        except OSError:
+            return False
+
+    def _load_saved(self, name):
+        saved = self._saved.pop(name)
+        return saved['candidates'], Tally.from_snapshot(saved['tally'])
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _sync_locked(self):
+        if not self.pending:
+            return
+        self._file.flush()
+        if self.sync_mode != 'none':
+            os.fsync(self._file.fileno())
+        self.pending = 0
+
+    def _flush_loop(self):
+        # Group commit: wake up when the first unsynced record arrives, give
+        # the batch max_delay seconds to fill, then fsync all of it at once
+        while True:
+            self._dirty.wait()
+            if self._closed:
+                return
+            self._dirty.clear()
+            time.sleep(self.max_delay)
+            self.sync()
+
+
+def read_records(path, start=0):
+    for _, record in read_records_at(path, start):
+        yield record
+
+
+def read_records_at(path, start=0, needle=None):
+    # (byte offset, record) for every complete line from `start`. With
+    # `needle` (bytes), only lines containing it are parsed; they are found
+    # with a search over whole blocks, so the rest cost little more than
+    # reading them.
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb') as f:
+        f.seek(start)
+        if needle is not None:
+            yield from _matching_lines(f, start, needle)
+            return
+        offset = start
+        for line in f:
+            if not line.endswith(b'\n'):
+                # Torn final write from a crash; it was never acknowledged
+                return
+            yield offset, json.loads(line)
+            offset += len(line)
+
+
+def _matching_lines(f, offset, needle, block_size=1 << 20):
+    rest = b''
+    while True:
+        data = f.read(block_size)
+        if not data:
+            # Anything left is a torn final write
+            return
+        block = rest + data
+        end = block.rfind(b'\n') + 1
+        pos = block.find(needle, 0, end)
+        while pos != -1:
+            line_start = block.rfind(b'\n', 0, pos) + 1
+            line_end = block.find(b'\n', pos) + 1
+            yield offset + line_start, json.loads(block[line_start:line_end])
+            pos = block.find(needle, line_end, end)
+        offset += end
+        rest = block[end:]
+
+
+def read_votes(path, name, start=None):
+    # Vote records of the latest election called `name` (an earlier one may
+    # have been discarded). `start` is the offset of its election record, if
+    # known; otherwise an extra pass finds it. Only lines naming the election
+    # are parsed.
+    needle = b'"election":' + json.dumps(name).encode('ascii')
+    if start is None:
+        for offset, record in read_records_at(path, needle=needle):
+            if record['op'] == 'election' and record['election'] == name:
+                start = offset
+        if start is None:
+            return
+    current = False
+    for _, record in read_records_at(path, start, needle):
+        if record['election'] != name:
+            continue
+        if record['op'] == 'election':
+            current = True
+        elif current and record['op'] == 'vote':
+            yield record
+
+
+def replay(path, start=0, elections=None, load=None, starts=None):
+    # Rebuild election state (name -> dict with status, candidates and a
+    # Tally) from a journal. Votes are collected per election and applied in
+    # one cast_many_indices() call each instead of one increment per line.
+    # To continue from a snapshot, pass the byte offset it covers and the
+    # elections it restored; load(name) -> (candidates, tally) fills in one
+    # whose tally is still None before the replay changes it. starts, if
+    # given, is updated with the offset each election was created at.
+    elections = OrderedDict() if elections is None else elections
+    pending_votes = {}
+
+    def apply_votes(name):
+        indices = pending_votes.pop(name, None)
+        if indices:
+            state = elections[name]
+            if state['tally'] is None:
+                state['candidates'], state['tally'] = load(name)
+            state['tally'].cast_many_indices(indices)
+
+    for offset, record in read_records_at(path, start):
+        op = record['op']
+        name = record['election']
+        if op == 'vote':
+            pending_votes.setdefault(name, []).append(record['candidate'])
+        elif op == 'election':
+            if starts is not None:
+                starts[name] = offset
+            elections[name] = {
+                'name': name,
+                'ballot_type': record.get('ballot_type', 'single'),
+                'seats': record.get('seats', 1),
+                'status': 'setup',
+                'candidates': [],
+                'tally': Tally()
+            }
+        elif op == 'candidates':
+            apply_votes(name)
+            elections[name]['candidates'] = record['candidates']
+            elections[name]['tally'] = Tally(c['name'] for c in record['candidates'])
+        elif op == 'status':
+            elections[name]['status'] = record['status']
+        elif op == 'discard':
+            pending_votes.pop(name, None)
+            elections.pop(name, None)
+            if starts is not None:
+                starts.pop(name, None)
+
+    for name in list(pending_votes):
+        apply_votes(name)
+    return elections
+
+
+def _truncate_torn_tail(path):
+    # Drop a partially written last line so new records start on a clean line
+    if not os.path.exists(path):
+        return
+    with open(path, 'rb+') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        pos = size
+        chunk = 4096
+        while pos > 0:
+            start = max(0, pos - chunk)
+            f.seek(start)
+            data = f.read(pos - start)
+            nl = data.rfind(b'\n')
+            if nl != -1:
+                f.truncate(start + nl + 1)
+                return
+            pos = start
+        f.truncate(0)
@@ -0,0 +1,175 @@
+# Ranked-choice ballots and instant-runoff / STV counting.
+#
+# Ballots are rows of a NumPy preference matrix: column k holds the index of
+# the voter's (k+1)th choice, -1 pads unused ranks. Counting never loops over
+# ballots in Python. Each ballot has a pointer to its current top continuing
+# choice; a round is one weighted bincount over those pointers, and after an
+# election or exclusion only the ballots sitting on that candidate have their
+# pointer advanced, again as array operations.
+#
+# Surpluses are transferred with fractional (Gregory) weights: when a
+# candidate passes the quota, every ballot currently counting for them keeps
+# surplus / total of its weight and moves on to its next choice.
+#
+# NumPy is imported when the first ranked election needs it rather than when
+# the app starts.
+np = None
+
+HOPEFUL, ELECTED, EXCLUDED = 0, 1, 2
+
+
+def numpy_available():
+    try:
+        _require_numpy()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _require_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("Ranked-choice counting needs NumPy (pip install numpy)") from None
+        np = numpy
+
+
+class RankedBallots:
+    def __init__(self, num_candidates, max_ranks=None, capacity=1024):
+        _require_numpy()
+        self.num_candidates = num_candidates
+        self.max_ranks = max_ranks or num_candidates
+        self._prefs = np.full((capacity, self.max_ranks), -1, dtype=np.int16)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def matrix(self):
+        return self._prefs[:self._size]
+
+    def add(self, ranking):
+        ranking = validate_ranking(ranking, self.num_candidates)[:self.max_ranks]
+        self._reserve(self._size + 1)
+        self._prefs[self._size, :len(ranking)] = ranking
+        self._size += 1
+
+    def add_matrix(self, prefs):
+        # Bulk load an (n, k) array of already valid rankings
+        prefs = np.asarray(prefs, dtype=np.int16)
+        k = min(prefs.shape[1], self.max_ranks)
+        self._reserve(self._size + len(prefs))
+        self._prefs[self._size:self._size + len(prefs), :k] = prefs[:, :k]
+        self._size += len(prefs)
+
+    def first_preferences(self):
+        firsts = self.matrix[:, 0]
+        return np.bincount(firsts[firsts >= 0], minlength=self.num_candidates)
+
+    def _reserve(self, size):
+        if size <= len(self._prefs):
+            return
+        grown = np.full((max(size, 2 * len(self._prefs)), self.max_ranks), -1, dtype=np.int16)
+        grown[:self._size] = self._prefs[:self._size]
+        self._prefs = grown
+
+
+def validate_ranking(ranking, num_candidates):
+    ranking = [int(idx) for idx in ranking]
+    if not ranking:
+        raise ValueError("A ranked ballot needs at least one choice")
+    if len(set(ranking)) != len(ranking):
+        raise ValueError("A candidate can only be ranked once")
+    if any(not 0 <= idx < num_candidates for idx in ranking):
+        raise ValueError("Candidate index out of range")
+    return ranking
+
+
+def count_stv(ballots, seats=1):
+    # Returns {'elected': [candidate indices in order of election],
+    #          'quota': float, 'rounds': [...]}; each round records the
+    # candidates' totals and who was elected or excluded in it.
+    # With one seat this is instant-runoff: the quota is a majority of the
+    # ballots still continuing in that round. Nobody is elected once no
+    # ballot is left (no ballots at all, or every one exhausted).
+    _require_numpy()
+    prefs = ballots.matrix
+    n = ballots.num_candidates
+    num_ballots, ranks = prefs.shape
+    status = np.zeros(n + 1, dtype=np.int8)  # slot n stands for "no choice" (-1)
+    status[n] = EXCLUDED
+    prefs_ext = np.where(prefs < 0, n, prefs)
+
+    weights = np.ones(num_ballots)
+    pos = np.zeros(num_ballots, dtype=np.int64)
+    rows = np.arange(num_ballots)
+    _advance(prefs_ext, status, pos, rows)
+
+    elected = []
+    retained = np.zeros(n)  # votes kept by elected candidates
+    rounds = []
+    quota = None
+    if seats > 1:
+        quota = float(num_ballots // (seats + 1) + 1)
+
+    while len(elected) < seats:
+        live = pos < ranks
+        current = prefs_ext[rows[live], pos[live]]
+        totals = np.bincount(current, weights=weights[live], minlength=n + 1)[:n]
+        totals = np.where(status[:n] == ELECTED, retained, totals)
+        hopeful = np.flatnonzero(status[:n] == HOPEFUL)
+        round_info = {'totals': totals.tolist(), 'elected': [], 'excluded': [],
+                      'exhausted': float(weights[~live].sum())}
+        rounds.append(round_info)
+        if not len(hopeful) or not live.any():
+            break
+
+        round_quota = quota
+        if round_quota is None:
+            round_quota = float(weights[live].sum() // 2 + 1)
+
+        # Everyone left gets a seat once hopefuls no longer outnumber seats
+        if len(hopeful) <= seats - len(elected):
+            for c in hopeful[np.argsort(-totals[hopeful], kind='stable')]:
+                status[c] = ELECTED
+                elected.append(int(c))
+                round_info['elected'].append(int(c))
+            break
+
+        best = hopeful[np.argmax(totals[hopeful])]
+        if totals[best] >= round_quota:
+            status[best] = ELECTED
+            elected.append(int(best))
+            round_info['elected'].append(int(best))
+            retained[best] = min(totals[best], round_quota)
+            on_best = rows[live][current == best]
+            if totals[best] > round_quota and quota is not None:
+                weights[on_best] *= (totals[best] - round_quota) / totals[best]
+            else:
+                weights[on_best] = 0.0
+            _advance(prefs_ext, status, pos, on_best)
+        else:
+            # Exclude the weakest hopeful; ties go against the later-registered
+            lowest = totals[hopeful].min()
+            loser = hopeful[totals[hopeful] == lowest][-1]
+            status[loser] = EXCLUDED
+            round_info['excluded'].append(int(loser))
+            _advance(prefs_ext, status, pos, rows[live][current == loser])
+
+    return {'elected': elected, 'quota': quota, 'rounds': rounds}
+
+
+def _advance(prefs_ext, status, pos, rows):
+    # Move each given ballot's pointer to its first still-hopeful choice at or
+    # after the current one (len(ranks) when the ballot is exhausted)
+    if not len(rows):
+        return
+    ranks = prefs_ext.shape[1]
+    sub = prefs_ext[rows]
+    cols = np.arange(ranks)
+    ok = (status[sub] == HOPEFUL) & (cols >= pos[rows][:, None])
+    first = ok.argmax(axis=1)
+    pos[rows] = np.where(ok.any(axis=1), first, ranks)
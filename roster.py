@@ -0,0 +1,140 @@
+# Voter roster and the per-election record of who has voted.
+#
+# The roster is a list of voter IDs (student numbers or the text on their
+# barcode cards), read from a CSV or a plain list with one ID per line. Each
+# ID maps to its position in the roster, and an election's has-voted record
+# is a bitmap over those positions: one bit per voter, about 6 KB for 50,000
+# students, so check-in is a dict lookup plus a bit test.
+#
+# The bitmap lives in its own small file, apart from the ballots, so nothing
+# on disk links a voter to their vote. Marking a voter rewrites the one byte
+# holding their bit; the file starts with a fingerprint of the roster so a
+# reordered or edited roster is never matched against stale bits. A roster
+# that only had voters added at the end still matches: the fingerprint of its
+# first `voters` IDs is the stored one, so the bits carry over.
+#
+#   magic 'SVR1' | sha256 of the roster (32 bytes) | voters (uint32) | bitmap
+import csv
+import hashlib
+import os
+import struct
+
+MAGIC = b'SVR1'
+HEADER = struct.Struct('<4s32sI')
+ID_COLUMNS = ('id', 'voter_id', 'student_id', 'barcode')
+
+
+class Roster:
+    def __init__(self, ids):
+        self.ids = []
+        self.index = {}
+        for voter_id in ids:
+            voter_id = normalize_id(voter_id)
+            if not voter_id:
+                continue
+            if voter_id in self.index:
+                raise ValueError(f"Voter ID {voter_id} appears more than once in the roster")
+            self.index[voter_id] = len(self.ids)
+            self.ids.append(voter_id)
+        self.fingerprint = self.fingerprint_of(len(self.ids))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def fingerprint_of(self, count):
+        # Fingerprint of the first `count` IDs
+        h = hashlib.sha256()
+        for voter_id in self.ids[:count]:
+            h.update(voter_id.encode('utf-8') + b'\n')
+        return h.digest()
+
+    @classmethod
+    def load(cls, path):
+        # A CSV with an ID column, or any text file with one ID per line
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            lines = f.read().splitlines()
+        if lines and path.lower().endswith('.csv'):
+            reader = csv.reader(lines)
+            header = [c.strip().lower() for c in next(reader)]
+            column = next((header.index(c) for c in ID_COLUMNS if c in header), None)
+            if column is None:
+                raise ValueError(f"Roster CSV needs one of these columns: {', '.join(ID_COLUMNS)}")
+            return cls(row[column] for row in reader if len(row) > column)
+        return cls(lines)
+
+    def lookup(self, voter_id):
+        # Roster position of an ID, or None for someone not on the roster
+        return self.index.get(normalize_id(voter_id))
+
+
+def normalize_id(voter_id):
+    # Scanners and keyboards disagree on case and stray whitespace
+    return voter_id.strip().upper()
+
+
+# The has-voted file was written for a roster this one doesn't extend
+class RosterMismatch(ValueError):
+    pass
+
+
+class VotedIndex:
+    def __init__(self, path, roster):
+        self.path = path
+        size = (len(roster) + 7) // 8
+        header = HEADER.pack(MAGIC, roster.fingerprint, len(roster))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if os.path.exists(path):
+            self._file = open(path, 'r+b', buffering=0)
+            stored = self._file.read(HEADER.size)
+            if stored != header:
+                if not self._extends(stored, roster):
+                    self._file.close()
+                    raise RosterMismatch(f"{path} was written for a different voter roster")
+                # Voters were added to the end of the roster; keep the bits
+                self._file.seek(0)
+                self._file.write(header)
+            self.bits = bytearray(self._file.read(size).ljust(size, b'\0'))
+        else:
+            self._file = open(path, 'w+b', buffering=0)
+            self.bits = bytearray(size)
+            self._file.write(header + self.bits)
+        self.count = sum(bin(byte).count('1') for byte in self.bits)
+
+    @staticmethod
+    def _extends(stored, roster):
+        if len(stored) != HEADER.size:
+            return False
+        magic, fingerprint, voters = HEADER.unpack(stored)
+        return (magic == MAGIC and voters <= len(roster)
+                and fingerprint == roster.fingerprint_of(voters))
+
+    def has_voted(self, idx):
+        return bool(self.bits[idx >> 3] & (1 << (idx & 7)))
+
+    def mark(self, idx):
+        # Record that voter `idx` has voted; False if they already had
+        byte = idx >> 3
+        bit = 1 << (idx & 7)
+        if self.bits[byte] & bit:
+            return False
+        self.bits[byte] |= bit
+        self._file.seek(HEADER.size + byte)
+        self._file.write(bytes((self.bits[byte],)))
+        self.count += 1
+        return True
+
+    def sync(self):
+        # Unbuffered writes survive the app crashing; this also covers power loss
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if not self._file.closed:
+            self.sync()
+            self._file.close()
+
+    @staticmethod
+    def remove(path):
+        if os.path.exists(path):
+            os.remove(path)
@@ -1,13 +1,112 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, PhotoImage
-from PIL import Image, ImageTk
 import os
+import csv
 import json
+import hashlib
+import socket
+import sys
+import time
 from datetime import datetime
 from collections import OrderedDict
+from itertools import groupby
+
+from audit import MerkleLog
+from ballots import BallotLog, now
+from candidate_import import read_csv, read_directory, validate_candidates
+from export import export_results
+from ingest import IngestWorker
+from journal import VoteJournal
+from metrics import Metrics
+from ranked import RankedBallots, count_stv, numpy_available
+from imagecache import ImageCache
+from roster import Roster, RosterMismatch, VotedIndex
+from session import SessionSnapshot
+from storage import ElectionStore
+from tally import Tally
+from thumbnails import PHOTO_SIZE, SYMBOL_SIZE
+from virtual_grid import VirtualGrid
+
+# Where elections are persisted: 'journal' (append-only log, replayed in full
+# on startup) or 'sqlite' (WAL database, elections loaded when first opened)
+STORAGE_BACKEND = 'journal'
+DATABASE_PATH = os.path.join('elections', 'elections.db')
+
+# Where the vote journal lives and how far its durability may lag behind the
+# screen (see journal.py for the sync modes; the SQLite backend uses the same
+# delay and batch size)
+JOURNAL_PATH = os.path.join('elections', 'votes.journal')
+JOURNAL_SYNC = 'batch'
+JOURNAL_MAX_DELAY = 0.25  # seconds
+JOURNAL_MAX_PENDING = 100  # votes
+
+# How a recorded vote is confirmed: 'modal' shows a messagebox that must be
+# dismissed, 'toast' shows a timed overlay so the next voter can go straight on
+CONFIRM_MODE = 'modal'
+CONFIRM_TOAST_MS = 1500
+# Ignore a second vote arriving this soon after the last one (0 = off)
+VOTE_DEBOUNCE_MS = 0
+
+# Votes are written by a background worker (see ingest.py for what the screen
+# shows meanwhile); the Tk thread counts the written ones this often
+INGEST_POLL_MS = 50
+INGEST_BATCH = 500
+
+# Photos and symbols of every election share one image cache; past this many
+# MB the least recently used images of hidden tabs are dropped and reloaded
+# when their tab is shown again
+IMAGE_CACHE_MB = 64
+
+# Session snapshot: lets a restart skip replaying the whole journal and keeps
+# candidate details typed into elections still in setup
+SESSION_PATH = os.path.join('elections', 'session.json')
+SESSION_SNAPSHOT_MS = 5000
+
+# Candidate grids only build the cards in view, so elections can be large
+MAX_CANDIDATES = 500
+VOTE_CARD_HEIGHT = 380
+RESULT_CARD_HEIGHT = 270
+
+# Ballot types offered in the setup screen
+BALLOT_TYPES = OrderedDict([
+    ("Single choice", 'single'),
+    ("Ranked choice (instant-runoff / STV)", 'ranked'),
+])
+
+# Optional live leaderboard beside the voting cards
+LIVE_RESULTS_MS = 1000  # refresh throttle
+LIVE_RESULTS_ROWS = 10
+
+# Optional voter roster: a CSV with an id column, or one ID per line. When set,
+# each voter checks in with their ID or barcode before a ballot is accepted,
+# and who has voted is kept per election under VOTED_DIR.
+ROSTER_PATH = None
+VOTED_DIR = os.path.join('elections', 'voted')
+
+# Structured log and latency histograms for the hot paths (see metrics.py).
+# Off, nothing is wrapped or logged; on, F12 writes the stats to STATS_PATH.
+METRICS_ENABLED = False
+METRICS_LOG_PATH = os.path.join('elections', 'school_voting.log')
+STATS_PATH = os.path.join('elections', 'stats.json')
+# Methods timed when metrics are on
+TIMED_METHODS = [
+    'record_vote', 'record_ranked_ballot', 'load_candidate_images',
+    'show_welcome_screen', 'show_election_setup', 'show_candidate_registration',
+    'show_voting_interface', 'show_results', 'write_results',
+]
+
+# Multi-booth mode: set to (host, port) of a machine running collector.py to
+# stream this booth's votes there and show the combined count
+COLLECTOR_ADDRESS = None  # e.g. ('192.168.1.10', 8765), see collector.DEFAULT_PORT
+BOOTH_ID = socket.gethostname()
 
 class SchoolVotingSystem:
-    def __init__(self, root):
+    def __init__(self, root, storage=STORAGE_BACKEND, database_path=DATABASE_PATH,
+                 journal_path=JOURNAL_PATH, journal_sync=JOURNAL_SYNC,
+                 journal_max_delay=JOURNAL_MAX_DELAY, journal_max_pending=JOURNAL_MAX_PENDING,
+                 confirm_mode=CONFIRM_MODE, vote_debounce_ms=VOTE_DEBOUNCE_MS,
+                 collector=COLLECTOR_ADDRESS, booth_id=BOOTH_ID, metrics=METRICS_ENABLED,
+                 roster=ROSTER_PATH, voted_dir=VOTED_DIR, session_path=SESSION_PATH):
         self.root = root
         self.root.title("Advanced School Voting System")
         self.root.geometry("1200x800")
@@ -18,6 +117,27 @@ class SchoolVotingSystem:
         self.current_election = None
         self.election_name = tk.StringVar()
         self.num_candidates = tk.IntVar(value=2)
+        self.ballot_type = tk.StringVar(value=next(iter(BALLOT_TYPES)))
+        self.seats = tk.IntVar(value=1)
+        # Keep each election's built view alive across tab switches and only
+        # patch what changed (set to False to rebuild on every switch)
+        self.cache_views = True
+        self.welcome_built_for = None
+        self.images = ImageCache(IMAGE_CACHE_MB << 20)
+        # Vote confirmation
+        self.confirm_mode = confirm_mode
+        self.vote_debounce_ms = vote_debounce_ms
+        self.last_vote_time = None
+        self.toast_after_id = None
+        # Voter roster, if voters must check in
+        self.roster = Roster.load(roster) if roster else None
+        self.voted_dir = voted_dir
+        # Instrumentation; wraps the methods before any widget binds them
+        self.metrics = None
+        if metrics:
+            self.metrics = Metrics(METRICS_LOG_PATH)
+            self.metrics.instrument(self, TIMED_METHODS)
+            self.root.bind('<F12>', lambda event: self.dump_stats())
         
         # Configure styles
         self.configure_styles()
@@ -34,10 +154,148 @@ class SchoolVotingSystem:
         self.welcome_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.welcome_tab, text="Welcome")
         
+        # Open the store; saved elections are restored once the window is up
+        if storage == 'sqlite':
+            self.store = ElectionStore(database_path, max_delay=journal_max_delay,
+                                       max_pending=journal_max_pending)
+        else:
+            self.store = VoteJournal(journal_path, sync=journal_sync,
+                                     max_delay=journal_max_delay,
+                                     max_pending=journal_max_pending)
+        self.ingest = IngestWorker(self.store, batch_size=INGEST_BATCH)
+        self.session = SessionSnapshot(session_path)
+        self.root.after(INGEST_POLL_MS, self.poll_ingest)
+        self.booth_id = booth_id
+        self.booth_client = None
+        self.collector = collector
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
         self.show_welcome_screen()
         
         # Bind notebook change event
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_change)
+        self.startup_done = False
+        self.root.after_idle(self.finish_startup)
+    
+    def finish_startup(self):
+        # Runs from the event loop so the Welcome tab is painted first
+        self.root.update()
+        self.restore_elections()
+        if self.collector:
+            from collector import BoothClient
+            self.booth_client = BoothClient(self.collector[0], self.collector[1], self.booth_id)
+        if self.elections:
+            # Adds the "Continue Existing Elections" button
+            self.show_welcome_screen()
+        self.root.after(SESSION_SNAPSHOT_MS, self.snapshot_loop)
+        self.startup_done = True
+    
+    def restore_elections(self):
+        # Tabs come back straight away; candidates, counts, ballots and images
+        # are loaded when a tab is first opened (see on_tab_change)
+        snapshot = self.session.read()
+        saved = snapshot['elections'] if snapshot else {}
+        for name, state in self.store.load_elections(snapshot).items():
+            if name in self.elections:
+                # Created in this session before the restore got to run
+                continue
+            tab = ttk.Frame(self.notebook)
+            self.notebook.add(tab, text=name)
+            state['tab'] = tab
+            state['images'] = []
+            if state['status'] == 'setup' and saved.get(name, {}).get('draft'):
+                state['draft'] = saved[name]['draft']
+            self.elections[name] = state
+        if snapshot and snapshot.get('selected') in self.elections:
+            self.notebook.select(self.elections[snapshot['selected']]['tab'])
+    
+    def snapshot_loop(self):
+        self.save_session()
+        self.root.after(SESSION_SNAPSHOT_MS, self.snapshot_loop)
+    
+    def save_session(self):
+        # Skipped while ballots are still being written, so the counts saved
+        # always match the journal position saved with them
+        if not self.ingest.idle():
+            return
+        self.count_written_votes()
+        selected = None
+        if self.current_election and self.current_election['name'] in self.elections:
+            selected = self.current_election['name']
+        try:
+            self.session.write(self.session_entries(), journal=os.path.abspath(self.store.path),
+                               journal_offset=self.store.position(),
+                               journal_starts=self.store.election_starts(), selected=selected)
+        except OSError:
+            # Only a cache; the journal still has everything
+            pass
+    
+    def session_entries(self):
+        # Where each election starts in the journal tells a re-created
+        # election from the one it replaced
+        starts = self.store.election_starts() or {}
+        for name, election in self.elections.items():
+            if election['tally'] is None:
+                # Never opened this session; the saved entry still holds
+                yield name, None, lambda election=election: self.session_state(election, None)
+                continue
+            draft = self.candidate_draft(election)
+            key = (starts.get(name), election['ballot_type'], election['seats'],
+                   election['status'], election['tally'].total, len(election['candidates']),
+                   json.dumps(draft))
+            yield name, key, lambda election=election, draft=draft: self.session_state(election, draft)
+    
+    def session_state(self, election, draft):
+        tally = election['tally']
+        return {
+            'name': election['name'],
+            'ballot_type': election['ballot_type'],
+            'seats': election['seats'],
+            'status': election['status'],
+            'candidates': election['candidates'],
+            'tally': tally.snapshot() if tally is not None else None,
+            'draft': draft
+        }
+    
+    def candidate_draft(self, election):
+        # What has been typed or picked so far for an election in setup
+        if election['status'] != 'setup':
+            return None
+        if 'candidate_entries' not in election:
+            return election.get('draft')
+        return [{'name': entry['name'].get(), 'photo_path': entry['photo_path'],
+                 'symbol_path': entry['symbol_path']}
+                for entry in election['candidate_entries']]
+    
+    def on_close(self):
+        if self.booth_client:
+            self.booth_client.close()
+        self.ingest.drain()
+        self.ingest.close()
+        self.save_session()
+        self.store.close()
+        for election in self.elections.values():
+            if 'voted' in election:
+                election['voted'].close()
+        if self.metrics:
+            self.metrics.dump(STATS_PATH)
+            self.metrics.close()
+        self.root.destroy()
+    
+    def log_event(self, message, **fields):
+        if self.metrics:
+            self.metrics.event(message, **fields)
+    
+    def dump_stats(self):
+        try:
+            stats = self.metrics.dump(STATS_PATH)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to write stats: {str(e)}")
+            return
+        votes = stats['timings'].get('record_vote', {})
+        messagebox.showinfo("Stats", f"Stats written to {STATS_PATH}\n"
+                                     f"Votes: {votes.get('count', 0)}, "
+                                     f"p90 latency: {votes.get('p90_ms')} ms")
     
     def configure_styles(self):
         self.style = ttk.Style()
@@ -60,6 +318,8 @@ class SchoolVotingSystem:
     def show_welcome_screen(self):
         for widget in self.welcome_tab.winfo_children():
             widget.destroy()
+        # The only dynamic part is the "Continue" button
+        self.welcome_built_for = bool(self.elections)
         
         welcome_frame = ttk.Frame(self.welcome_tab)
         welcome_frame.pack(fill=tk.BOTH, expand=True, padx=50, pady=50)
@@ -134,12 +394,23 @@ class SchoolVotingSystem:
         
         # Number of Candidates
         ttk.Label(scrollable_frame, text="Number of Candidates:").grid(row=2, column=0, padx=10, pady=5, sticky='e')
-        num_spin = ttk.Spinbox(scrollable_frame, textvariable=self.num_candidates, from_=2, to=10)
+        num_spin = ttk.Spinbox(scrollable_frame, textvariable=self.num_candidates, from_=2, to=MAX_CANDIDATES)
         num_spin.grid(row=2, column=1, padx=10, pady=5, sticky='w')
         
+        # Ballot type
+        ttk.Label(scrollable_frame, text="Ballot Type:").grid(row=3, column=0, padx=10, pady=5, sticky='e')
+        type_combo = ttk.Combobox(scrollable_frame, textvariable=self.ballot_type,
+                                  values=list(BALLOT_TYPES), state='readonly', width=36)
+        type_combo.grid(row=3, column=1, padx=10, pady=5, sticky='w')
+        
+        # Seats (ranked elections only; 1 seat is instant-runoff)
+        ttk.Label(scrollable_frame, text="Seats to Fill:").grid(row=4, column=0, padx=10, pady=5, sticky='e')
+        seats_spin = ttk.Spinbox(scrollable_frame, textvariable=self.seats, from_=1, to=MAX_CANDIDATES)
+        seats_spin.grid(row=4, column=1, padx=10, pady=5, sticky='w')
+        
         # Buttons
         btn_frame = ttk.Frame(scrollable_frame)
-        btn_frame.grid(row=3, column=0, columnspan=2, pady=20)
+        btn_frame.grid(row=5, column=0, columnspan=2, pady=20)
         
         create_btn = ttk.Button(btn_frame, text="Create Election", 
                               style='Primary.TButton',
@@ -155,6 +426,18 @@ class SchoolVotingSystem:
         scrollable_frame.columnconfigure(1, weight=1)
     
     def close_tab(self, tab):
+        for name, election in list(self.elections.items()):
+            if election['tab'] is tab:
+                self.flush_votes()
+                self.store.log_discard(name)
+                self.log_event("Election discarded", election=name)
+                if 'voted' in election:
+                    election['voted'].close()
+                VotedIndex.remove(self.voted_path(name))
+                self.images.release(name)
+                del self.elections[name]
+                if self.current_election is election:
+                    self.current_election = None
         self.notebook.forget(tab)
         if not self.elections:
             self.show_welcome_screen()
@@ -174,17 +457,34 @@ class SchoolVotingSystem:
             messagebox.showerror("Error", "Please select at least 2 candidates")
             return
         
+        ballot_type = BALLOT_TYPES[self.ballot_type.get()]
+        seats = 1
+        if ballot_type == 'ranked':
+            if not numpy_available():
+                messagebox.showerror("Error", "Ranked-choice elections need NumPy to be installed")
+                return
+            seats = self.seats.get()
+            if not 1 <= seats < num_candidates:
+                messagebox.showerror("Error", "Seats must be at least 1 and fewer than the candidates")
+                return
+        
         # Create new election structure
         election = {
             'name': name,
+            'ballot_type': ballot_type,
+            'seats': seats,
             'status': 'setup',
             'candidates': [],
-            'votes': {},
+            'tally': Tally(),
             'tab': setup_tab,
-            'photo_refs': [],  # To keep references to images
-            'symbol_refs': []
+            'images': []  # (photo, symbol) image cache keys per candidate
         }
         
+        self.store.log_election(name, ballot_type, seats)
+        # A reused name starts with nobody marked as voted
+        VotedIndex.remove(self.voted_path(name))
+        self.log_event("Election created", election=name, ballot_type=ballot_type,
+                       seats=seats, candidates=num_candidates)
         self.elections[name] = election
         self.current_election = election
         
@@ -224,10 +524,12 @@ class SchoolVotingSystem:
         ttk.Label(scrollable_frame, text=f"Register Candidates for {self.current_election['name']}", 
                  style='Title.TLabel').grid(row=0, column=0, columnspan=3, pady=20)
         
-        # Create frames for each candidate
+        # Create frames for each candidate, filled in from a restored session
         self.candidate_entries = []
+        drafts = self.current_election.pop('draft', None) or []
+        count = len(drafts) or self.num_candidates.get()
         
-        for i in range(self.num_candidates.get()):
+        for i in range(count):
             candidate_frame = ttk.LabelFrame(scrollable_frame, text=f"Candidate {i+1}")
             candidate_frame.grid(row=i+1, column=0, columnspan=3, padx=10, pady=10, sticky='ew')
             
@@ -261,18 +563,33 @@ class SchoolVotingSystem:
                 'photo_path': None,
                 'symbol_path': None
             })
+            if i < len(drafts):
+                name_entry.insert(0, drafts[i]['name'])
+                for key, btn, text in (('photo_path', photo_btn, "✓ Photo Uploaded"),
+                                       ('symbol_path', symbol_btn, "✓ Symbol Uploaded")):
+                    if drafts[i][key]:
+                        self.candidate_entries[i][key] = drafts[i][key]
+                        btn.config(text=text)
             
             candidate_frame.columnconfigure(1, weight=1)
         
         # Button frame
         btn_frame = ttk.Frame(scrollable_frame)
-        btn_frame.grid(row=self.num_candidates.get()+2, column=0, columnspan=3, pady=20)
+        btn_frame.grid(row=count+2, column=0, columnspan=3, pady=20)
         
         start_btn = ttk.Button(btn_frame, text="Start Voting", 
                              style='Primary.TButton',
                              command=self.start_voting_process)
         start_btn.pack(side=tk.LEFT, padx=10)
         
+        import_csv_btn = ttk.Button(btn_frame, text="Import from CSV...", 
+                                  command=self.import_candidates_csv)
+        import_csv_btn.pack(side=tk.LEFT, padx=10)
+        
+        import_dir_btn = ttk.Button(btn_frame, text="Import from Folder...", 
+                                  command=self.import_candidates_folder)
+        import_dir_btn.pack(side=tk.LEFT, padx=10)
+        
         cancel_btn = ttk.Button(btn_frame, text="Cancel", 
                               command=lambda: self.close_tab(tab))
         cancel_btn.pack(side=tk.LEFT, padx=10)
@@ -281,6 +598,9 @@ class SchoolVotingSystem:
         scrollable_frame.columnconfigure(0, weight=1)
         scrollable_frame.columnconfigure(1, weight=3)
         scrollable_frame.columnconfigure(2, weight=1)
+        
+        self.current_election['candidate_entries'] = self.candidate_entries
+        self.current_election['view'] = 'setup'
     
     def upload_photo(self, candidate_idx):
         file_path = filedialog.askopenfilename(
@@ -313,20 +633,76 @@ class SchoolVotingSystem:
                 messagebox.showerror("Error", f"Please upload a symbol for Candidate {idx+1}")
                 return
         
-        # Store candidates and initialize votes
-        self.current_election['candidates'] = []
-        self.current_election['votes'] = {}
-        
+        candidates = []
         for candidate in self.candidate_entries:
-            name = candidate['name'].get().strip()
-            self.current_election['candidates'].append({
-                'name': name,
+            candidates.append({
+                'name': candidate['name'].get().strip(),
                 'photo_path': candidate['photo_path'],
                 'symbol_path': candidate['symbol_path']
             })
-            self.current_election['votes'][name] = 0
+        self.begin_voting(candidates)
+    
+    def import_candidates_csv(self):
+        file_path = filedialog.askopenfilename(
+            title="Import Candidates from CSV",
+            filetypes=[("CSV files", "*.csv")]
+        )
+        if file_path:
+            self.import_candidates(read_csv, file_path)
+    
+    def import_candidates_folder(self):
+        folder = filedialog.askdirectory(title="Folder with photos/ and symbols/ subfolders")
+        if folder:
+            self.import_candidates(read_directory, folder)
+    
+    def import_candidates(self, reader, path):
+        try:
+            candidates = reader(path)
+        except (OSError, ValueError, KeyError, csv.Error) as e:
+            messagebox.showerror("Error", f"Failed to import candidates: {str(e)}")
+            return
+        if len(candidates) < 2:
+            messagebox.showerror("Error", "Please import at least 2 candidates")
+            return
+        self.begin_voting(candidates)
+    
+    def begin_voting(self, candidates):
+        # Same rule as create_election; an import may bring fewer candidates
+        # than the number chosen there
+        seats = self.current_election['seats']
+        if self.current_election['ballot_type'] == 'ranked' and not 1 <= seats < len(candidates):
+            messagebox.showerror("Error", f"This election fills {seats} seats, so it needs more "
+                                          f"than {seats} candidates")
+            return
+        
+        # Check every name and decode every image (in parallel) up front so
+        # all problems are reported together
+        self.root.config(cursor='watch')
+        self.root.update_idletasks()
+        try:
+            errors = validate_candidates(candidates)
+        finally:
+            self.root.config(cursor='')
+        if errors:
+            shown = errors[:20]
+            if len(errors) > len(shown):
+                shown.append(f"... and {len(errors) - len(shown)} more")
+            messagebox.showerror("Error", "Please fix these candidates:\n\n" + "\n".join(shown))
+            return
+        
+        # Store candidates and initialize votes
+        self.current_election['candidates'] = candidates
+        self.current_election['tally'] = Tally(c['name'] for c in candidates)
+        self.current_election['ballots'] = BallotLog()
+        self.current_election['audit'] = MerkleLog()
+        if self.current_election['ballot_type'] == 'ranked':
+            self.current_election['ranked'] = RankedBallots(len(candidates))
+            self.current_election['ranking'] = []
         
         self.current_election['status'] = 'voting'
+        self.store.log_candidates(self.current_election['name'], candidates)
+        self.store.log_status(self.current_election['name'], 'voting')
+        self.log_event("Voting started", election=self.current_election['name'])
         
         # Load images
         self.load_candidate_images()
@@ -335,30 +711,34 @@ class SchoolVotingSystem:
         self.show_voting_interface()
     
     def load_candidate_images(self):
-        self.current_election['photo_refs'] = []
-        self.current_election['symbol_refs'] = []
-        
-        for candidate in self.current_election['candidates']:
-            # Load and resize candidate photo
-            try:
-                photo_img = Image.open(candidate['photo_path'])
-                photo_img = photo_img.resize((180, 180), Image.LANCZOS)
-                photo_tk = ImageTk.PhotoImage(photo_img)
-                self.current_election['photo_refs'].append(photo_tk)
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to load photo: {str(e)}")
+        election = self.current_election
+        self.images.activate(election['name'])
+        
+        # Images not in the shared cache are decoded and resized in the
+        # thumbnail worker pool; the election only keeps their keys
+        requests = []
+        for candidate in election['candidates']:
+            requests.append((candidate['photo_path'], PHOTO_SIZE))
+            requests.append((candidate['symbol_path'], SYMBOL_SIZE))
+        keys, errors = self.images.load(requests, election['name'])
+        # Every candidate keeps its keys; a card whose image failed shows
+        # just the text
+        election['images'] = list(zip(keys[0::2], keys[1::2]))
+        
+        for photo_key, symbol_key in election['images']:
+            if photo_key in errors:
+                messagebox.showerror("Error", f"Failed to load photo: {str(errors[photo_key])}")
                 return
-            
-            # Load and resize symbol
-            try:
-                symbol_img = Image.open(candidate['symbol_path'])
-                symbol_img = symbol_img.resize((60, 60), Image.LANCZOS)
-                symbol_tk = ImageTk.PhotoImage(symbol_img)
-                self.current_election['symbol_refs'].append(symbol_tk)
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to load symbol: {str(e)}")
+            if symbol_key in errors:
+                messagebox.showerror("Error", f"Failed to load symbol: {str(errors[symbol_key])}")
                 return
     
+    def candidate_images(self, election, idx):
+        # (photo, symbol) PhotoImages, reloaded if they were evicted
+        photo_key, symbol_key = election['images'][idx]
+        return (self.images.get(photo_key, election['name']) or '',
+                self.images.get(symbol_key, election['name']) or '')
+    
     def show_voting_interface(self):
         tab = self.current_election['tab']
         for widget in tab.winfo_children():
@@ -373,68 +753,388 @@ class SchoolVotingSystem:
                  style='Title.TLabel').pack(pady=10)
         
         # Instructions
-        ttk.Label(main_frame, text="Click on a candidate to cast your vote", 
+        election = self.current_election
+        if election['ballot_type'] == 'ranked':
+            instructions = "Click candidates in order of preference, then submit your ballot"
+        else:
+            instructions = "Click on a candidate to cast your vote"
+        ttk.Label(main_frame, text=instructions, 
                  font=('Segoe UI', 11)).pack(pady=5)
         
-        # Create canvas and scrollbar for candidates
-        canvas = tk.Canvas(main_frame, highlightthickness=0)
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
-        candidates_frame = ttk.Frame(canvas)
+        if election['ballot_type'] == 'ranked':
+            # The voter's ranking so far, with submit/clear
+            ranking_frame = ttk.Frame(main_frame)
+            ranking_frame.pack(fill=tk.X, pady=5)
+            ranking_label = ttk.Label(ranking_frame, font=('Segoe UI', 11), wraplength=700)
+            ranking_label.pack(side=tk.LEFT, padx=10, fill=tk.X, expand=True)
+            ttk.Button(ranking_frame, text="Clear", 
+                      command=self.clear_ranking).pack(side=tk.RIGHT, padx=5)
+            ttk.Button(ranking_frame, text="Submit Ballot", style='Primary.TButton',
+                      command=self.submit_ranked_ballot).pack(side=tk.RIGHT, padx=5)
+            election['ranking_label'] = ranking_label
+        
+        if self.uses_checkin(election):
+            # Voter check-in; barcode scanners type the ID and press Enter
+            checkin_frame = ttk.Frame(main_frame)
+            checkin_frame.pack(fill=tk.X, pady=5)
+            ttk.Label(checkin_frame, text="Voter ID:").pack(side=tk.LEFT, padx=10)
+            voter_entry = ttk.Entry(checkin_frame, width=25)
+            voter_entry.pack(side=tk.LEFT)
+            voter_entry.bind('<Return>', lambda event: self.check_in_voter(election))
+            ttk.Button(checkin_frame, text="Check In",
+                      command=lambda: self.check_in_voter(election)).pack(side=tk.LEFT, padx=5)
+            voter_status = ttk.Label(checkin_frame, font=('Segoe UI', 11))
+            voter_status.pack(side=tk.LEFT, padx=10)
+            election['checkin'] = {'entry': voter_entry, 'status': voter_status}
+            election['voter'] = None
+            self.update_checkin_status(election)
+            voter_entry.focus_set()
+        
+        # Candidate cards; only the ones scrolled into view are built
+        grid = VirtualGrid(main_frame, self.make_vote_card,
+                           lambda card, idx: self.fill_vote_card(election, card, idx),
+                           row_height=VOTE_CARD_HEIGHT, columns=2)
+        grid.pack(fill=tk.BOTH, expand=True)
+        grid.set_item_count(len(election['candidates']))
+        election['vote_grid'] = grid
+        if election['ballot_type'] == 'ranked':
+            self.update_ranking_view(election)
+        
+        # Live results panel, packed beside the cards when toggled on
+        live_frame = ttk.LabelFrame(main_frame, text="Live Results")
+        live_rows = []
+        for _ in range(min(LIVE_RESULTS_ROWS, len(election['candidates']))):
+            row = ttk.Label(live_frame, width=30)
+            row.pack(anchor='w', padx=10, pady=2)
+            live_rows.append(row)
+        election['live_panel'] = {'frame': live_frame, 'rows': live_rows,
+                                  'grid': grid, 'after_id': None}
         
-        candidates_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(
-                scrollregion=canvas.bbox("all")
-            )
-        )
-        
-        canvas.create_window((0, 0), window=candidates_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # Display candidates in a grid
-        for idx, candidate in enumerate(self.current_election['candidates']):
-            candidate_card = ttk.Frame(candidates_frame, borderwidth=1, relief='solid')
-            candidate_card.grid(row=idx//2, column=idx%2, padx=10, pady=10, sticky='nsew')
-            
-            # Photo
-            photo_label = ttk.Label(candidate_card, 
-                                 image=self.current_election['photo_refs'][idx])
-            photo_label.pack(pady=10)
-            
-            # Name
-            ttk.Label(candidate_card, text=candidate['name'], 
-                    font=('Segoe UI', 12, 'bold')).pack()
-            
-            # Symbol
-            symbol_label = ttk.Label(candidate_card, 
-                                   image=self.current_election['symbol_refs'][idx])
-            symbol_label.pack(pady=5)
-            
-            # Vote button
-            vote_btn = ttk.Button(candidate_card, text="Vote for this Candidate", 
-                                style='Primary.TButton',
-                                command=lambda name=candidate['name']: self.cast_vote(name))
-            vote_btn.pack(pady=10, padx=20, fill=tk.X)
-            
-            # Configure grid weights
-            candidates_frame.columnconfigure(0, weight=1)
-            candidates_frame.columnconfigure(1, weight=1)
+        # Button frame
+        btn_frame = ttk.Frame(main_frame)
+        btn_frame.pack(pady=20)
         
         # End voting button
-        end_btn = ttk.Button(main_frame, text="End Voting & Show Results", 
+        end_btn = ttk.Button(btn_frame, text="End Voting & Show Results", 
                            style='Success.TButton',
                            command=self.end_voting)
-        end_btn.pack(pady=20, ipadx=20, ipady=5)
+        end_btn.pack(side=tk.LEFT, padx=10, ipadx=20, ipady=5)
+        
+        live_btn = ttk.Button(btn_frame, text="Show Live Results",
+                            command=lambda: self.toggle_live_results(election, live_btn))
+        live_btn.pack(side=tk.LEFT, padx=10)
+        
+        if self.booth_client:
+            if election['ballot_type'] != 'ranked':
+                # Idempotent, so restored elections get registered too
+                self.booth_client.register_election(election['name'], election['tally'].names)
+            self.add_combined_label(btn_frame, election)
+        
+        # Confirmation overlay for 'toast' mode, placed over the cards on demand
+        self.current_election['toast'] = tk.Label(main_frame, bg='#2ecc71', fg='white',
+                                                  font=('Segoe UI', 16, 'bold'),
+                                                  padx=30, pady=20)
+        
+        self.current_election['view'] = 'voting'
+    
+    def make_vote_card(self, parent):
+        candidate_card = ttk.Frame(parent, borderwidth=1, relief='solid')
+        
+        # Photo
+        photo_label = ttk.Label(candidate_card)
+        photo_label.pack(pady=10)
+        
+        # Name
+        name_label = ttk.Label(candidate_card, font=('Segoe UI', 12, 'bold'))
+        name_label.pack()
+        
+        # Symbol
+        symbol_label = ttk.Label(candidate_card)
+        symbol_label.pack(pady=5)
+        
+        # Vote button
+        vote_btn = ttk.Button(candidate_card, text="Vote for this Candidate", 
+                            style='Primary.TButton')
+        vote_btn.pack(pady=10, padx=20, fill=tk.X)
+        
+        return {
+            'frame': candidate_card,
+            'photo': photo_label,
+            'name': name_label,
+            'symbol': symbol_label,
+            'vote_btn': vote_btn
+        }
+    
+    def fill_vote_card(self, election, card, idx):
+        candidate = election['candidates'][idx]
+        photo, symbol = self.candidate_images(election, idx)
+        card['photo'].config(image=photo)
+        card['name'].config(text=candidate['name'])
+        card['symbol'].config(image=symbol)
+        if election['ballot_type'] == 'ranked':
+            if idx in election['ranking']:
+                card['vote_btn'].config(text=f"Ranked #{election['ranking'].index(idx) + 1}",
+                                        state='disabled')
+            else:
+                card['vote_btn'].config(text="Rank this Candidate", state='normal',
+                                        command=lambda i=idx: self.rank_candidate(i))
+        else:
+            card['vote_btn'].config(command=lambda name=candidate['name']: self.cast_vote(name))
+    
+    def toggle_live_results(self, election, button):
+        panel = election['live_panel']
+        if panel['after_id'] is None:
+            panel['frame'].pack(side=tk.RIGHT, fill=tk.Y, padx=(10, 0), before=panel['grid'])
+            button.config(text="Hide Live Results")
+            self.refresh_live_results(election, panel, full=True)
+        else:
+            self.root.after_cancel(panel['after_id'])
+            panel['after_id'] = None
+            panel['frame'].pack_forget()
+            button.config(text="Show Live Results")
+    
+    def refresh_live_results(self, election, panel, full=False):
+        if not panel['frame'].winfo_exists():
+            # Voting ended and the view was replaced
+            panel['after_id'] = None
+            return
+        tally = election['tally']
+        changed = tally.take_changes()
+        ranks = range(len(panel['rows'])) if full else changed
+        for rank in ranks:
+            if rank >= len(panel['rows']):
+                break
+            idx = tally.order[rank]
+            panel['rows'][rank].config(
+                text=f"{rank+1}. {tally.names[idx]} - {tally.counts[idx]} votes")
+        panel['after_id'] = self.root.after(LIVE_RESULTS_MS, self.refresh_live_results,
+                                          election, panel)
+    
+    def add_combined_label(self, parent, election):
+        label = ttk.Label(parent, font=('Segoe UI', 11, 'bold'))
+        label.pack(side=tk.LEFT, padx=10)
+        if election['ballot_type'] == 'ranked':
+            # Ranked ballots aren't forwarded to the collector yet
+            label.config(text="This booth only: ranked ballots are not combined")
+            return
+        self.refresh_combined_label(election, label)
+    
+    def refresh_combined_label(self, election, label):
+        # Polls the totals the collector pushes back; stops with the view
+        if not label.winfo_exists():
+            return
+        results = self.booth_client.results.get(election['name'])
+        refused = self.booth_client.rejected.get(election['name'])
+        if refused is not None:
+            # This booth's votes are kept locally but not sent
+            label.config(text=f"Not combined: {refused}", foreground='#e74c3c')
+        elif results is None:
+            label.config(text="All booths: waiting for collector", foreground='')
+        else:
+            label.config(text=f"All booths: {results['total_votes']} votes", foreground='')
+        self.root.after(LIVE_RESULTS_MS, self.refresh_combined_label, election, label)
+    
+    def accept_click(self):
+        # False for a double-click arriving within the debounce window
+        clicked_at = time.monotonic()
+        if (self.vote_debounce_ms and self.last_vote_time is not None
+                and (clicked_at - self.last_vote_time) * 1000 < self.vote_debounce_ms):
+            if self.metrics:
+                self.metrics.count('debounced_clicks')
+            return False
+        self.last_vote_time = clicked_at
+        return True
+    
+    def voted_path(self, name):
+        # File names can't hold every election name, so use a hash of it
+        digest = hashlib.sha256(name.encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.voted_dir, f"{digest}.voted")
+    
+    def voted_index(self, election):
+        if 'voted' not in election:
+            election['voted'] = VotedIndex(self.voted_path(election['name']), self.roster)
+        return election['voted']
+    
+    def uses_checkin(self, election):
+        # Check-in applies unless it was turned off for this election after
+        # the roster changed under it
+        if not self.roster or election.get('checkin_off'):
+            return False
+        try:
+            self.voted_index(election)
+        except RosterMismatch:
+            rebuild = messagebox.askyesno(
+                "Voter roster changed",
+                f"The voter roster has changed since voting started in '{election['name']}', "
+                "so its record of who has voted no longer matches it.\n\n"
+                "Yes: start a new record for the current roster (voters who already "
+                "voted could check in again).\n"
+                "No: turn off check-in for this election.")
+            if not rebuild:
+                election['checkin_off'] = True
+                return False
+            VotedIndex.remove(self.voted_path(election['name']))
+            self.voted_index(election)
+            self.log_event("Voted record rebuilt", election=election['name'])
+        return True
+    
+    def check_in_voter(self, election):
+        entry = election['checkin']['entry']
+        voter_id = entry.get().strip()
+        entry.delete(0, tk.END)
+        if not voter_id:
+            return
+        idx = self.roster.lookup(voter_id)
+        if idx is None:
+            messagebox.showerror("Error", f"{voter_id} is not on the voter roster")
+        elif self.voted_index(election).has_voted(idx):
+            messagebox.showerror("Error", f"{voter_id} has already voted in this election")
+        else:
+            election['voter'] = idx
+        self.update_checkin_status(election)
+    
+    def update_checkin_status(self, election):
+        voted = self.voted_index(election).count
+        if election.get('voter') is None:
+            text = "Scan or type your voter ID, then press Enter"
+        else:
+            text = f"Checked in: {self.roster.ids[election['voter']]} - please vote"
+        election['checkin']['status'].config(text=f"{text}  ({voted} of {len(self.roster)} voted)")
+    
+    def take_voter(self, election):
+        # With a roster, mark the checked-in voter as voted before their
+        # ballot is recorded; False if nobody is checked in
+        if not self.roster or election.get('checkin_off'):
+            return True
+        if election.get('voter') is None:
+            messagebox.showerror("Error", "Please check in with your voter ID first")
+            return False
+        self.voted_index(election).mark(election['voter'])
+        election['voter'] = None
+        self.update_checkin_status(election)
+        election['checkin']['entry'].focus_set()
+        return True
     
     def cast_vote(self, candidate_name):
-        self.current_election['votes'][candidate_name] += 1
-        messagebox.showinfo("Vote Recorded", f"Your vote for {candidate_name} has been counted!")
+        if self.record_vote(candidate_name):
+            self.confirm_vote(f"Your vote for {candidate_name} has been counted!")
+    
+    def record_vote(self, candidate_name):
+        # Everything up to the confirmation, which in 'modal' mode waits for
+        # the voter; kept apart so metrics time only this part
+        if not self.accept_click():
+            return False
+        if not self.take_voter(self.current_election):
+            return False
+        
+        idx = self.current_election['tally'].index[candidate_name]
+        # Written by the ingest worker and counted once it is in the log
+        self.ingest.submit(self.current_election, idx, now())
+        if self.booth_client:
+            self.booth_client.submit(self.current_election['name'], idx)
+        return True
+    
+    def rank_candidate(self, idx):
+        election = self.current_election
+        if idx not in election['ranking']:
+            election['ranking'].append(idx)
+            self.update_ranking_view(election)
+    
+    def clear_ranking(self):
+        self.current_election['ranking'] = []
+        self.update_ranking_view(self.current_election)
+    
+    def update_ranking_view(self, election):
+        names = election['tally'].names
+        if election['ranking']:
+            text = "Your ranking: " + ", ".join(
+                f"{pos+1}. {names[idx]}" for pos, idx in enumerate(election['ranking']))
+        else:
+            text = "Your ranking: (no candidates chosen yet)"
+        election['ranking_label'].config(text=text)
+        election['vote_grid'].refresh(refill=True)
+    
+    def submit_ranked_ballot(self):
+        if not self.current_election['ranking']:
+            messagebox.showerror("Error", "Please rank at least one candidate")
+            return
+        if self.record_ranked_ballot(self.current_election):
+            self.confirm_vote("Your ranked ballot has been counted!")
+    
+    def record_ranked_ballot(self, election):
+        if not self.accept_click():
+            return False
+        if not self.take_voter(election):
+            return False
+        
+        ranking = election['ranking']
+        self.ingest.submit(election, ranking[0], now(), ranking=ranking)
+        
+        election['ranking'] = []
+        self.update_ranking_view(election)
+        return True
+    
+    def poll_ingest(self):
+        self.count_written_votes()
+        self.root.after(INGEST_POLL_MS, self.poll_ingest)
+    
+    def count_written_votes(self):
+        # Count, in one batch per election, the ballots the ingest worker
+        # has written since the last poll
+        written = self.ingest.take_written()
+        for _, ballots in groupby(written, key=lambda ballot: id(ballot[0])):
+            ballots = list(ballots)
+            election = ballots[0][0]
+            election['tally'].cast_many_indices([ballot[1] for ballot in ballots])
+            for _, idx, cast_at, ranking in ballots:
+                # First preferences drive the live leaderboard and turnout records
+                election['ballots'].append(idx, self.booth_id, cast_at)
+                election['audit'].append(idx, cast_at)
+                if ranking is not None:
+                    election['ranked'].add(ranking)
+        
+        failed = 0
+        while self.ingest.errors:
+            (election, _, _, _), error = self.ingest.errors.popleft()
+            failed += 1
+        if failed:
+            messagebox.showerror("Error", f"{failed} vote(s) in {election['name']} "
+                                          f"could not be saved: {str(error)}")
+    
+    def flush_votes(self):
+        # Wait for every queued ballot to be written, then count it
+        self.ingest.drain()
+        self.count_written_votes()
+    
+    def confirm_vote(self, message):
+        if self.confirm_mode == 'toast':
+            self.show_vote_toast(message)
+        else:
+            messagebox.showinfo("Vote Recorded", message)
+    
+    def show_vote_toast(self, message):
+        toast = self.current_election['toast']
+        toast.config(text=message)
+        toast.place(relx=0.5, rely=0.5, anchor='center')
+        toast.lift()
+        # Each vote restarts the timer rather than stacking overlays
+        if self.toast_after_id is not None:
+            self.root.after_cancel(self.toast_after_id)
+        self.toast_after_id = self.root.after(CONFIRM_TOAST_MS, self.hide_vote_toast, toast)
+    
+    def hide_vote_toast(self, toast):
+        self.toast_after_id = None
+        if toast.winfo_exists():
+            toast.place_forget()
     
     def end_voting(self):
+        self.flush_votes()
+        if 'voted' in self.current_election:
+            self.current_election['voted'].sync()
         self.current_election['status'] = 'completed'
+        self.store.log_status(self.current_election['name'], 'completed')
+        self.log_event("Voting ended", election=self.current_election['name'],
+                       votes=self.current_election['tally'].total)
         self.show_results()
     
     def show_results(self):
@@ -450,71 +1150,38 @@ class SchoolVotingSystem:
         ttk.Label(main_frame, text=f"Results: {self.current_election['name']}", 
                  style='Title.TLabel').pack(pady=10)
         
-        # Sort candidates by votes
-        sorted_candidates = sorted(
-            self.current_election['candidates'],
-            key=lambda x: self.current_election['votes'][x['name']],
-            reverse=True
-        )
-        
-        # Create canvas and scrollbar for results
-        canvas = tk.Canvas(main_frame, highlightthickness=0)
-        scrollbar = ttk.Scrollbar(main_frame, orient="vertical", command=canvas.yview)
-        results_frame = ttk.Frame(canvas)
-        
-        results_frame.bind(
-            "<Configure>",
-            lambda e: canvas.configure(
-                scrollregion=canvas.bbox("all")
-            )
-        )
-        
-        canvas.create_window((0, 0), window=results_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        
-        canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        
-        # Display results
-        for idx, candidate in enumerate(sorted_candidates):
-            result_card = ttk.Frame(results_frame, borderwidth=1, relief='solid')
-            result_card.pack(fill=tk.X, padx=10, pady=10)
-            
-            # Position label
-            position = ttk.Label(result_card, 
-                               text=f"{idx+1}. {candidate['name']}",
-                               font=('Segoe UI', 14, 'bold'))
-            position.pack(anchor='w', padx=10, pady=5)
-            
-            # Details frame
-            details_frame = ttk.Frame(result_card)
-            details_frame.pack(fill=tk.X, padx=10, pady=5)
-            
-            # Get the original index for images
-            orig_idx = next(
-                i for i, c in enumerate(self.current_election['candidates']) 
-                if c['name'] == candidate['name']
-            )
-            
-            # Photo
-            photo_frame = ttk.Frame(details_frame)
-            photo_frame.pack(side=tk.LEFT, padx=10)
-            ttk.Label(photo_frame, 
-                     image=self.current_election['photo_refs'][orig_idx]).pack()
-            
-            # Votes
-            votes_frame = ttk.Frame(details_frame)
-            votes_frame.pack(side=tk.LEFT, padx=10, fill=tk.Y)
-            
-            ttk.Label(votes_frame, 
-                     text=f"Total Votes: {self.current_election['votes'][candidate['name']]}",
-                     font=('Segoe UI', 12)).pack(anchor='w', pady=5)
-            
-            # Symbol
-            symbol_frame = ttk.Frame(details_frame)
-            symbol_frame.pack(side=tk.RIGHT, padx=10)
-            ttk.Label(symbol_frame, 
-                     image=self.current_election['symbol_refs'][orig_idx]).pack()
+        # Turnout summary from the per-ballot records
+        peak = self.current_election['ballots'].peak_minute()
+        if peak:
+            ttk.Label(main_frame, 
+                     text=f"Busiest minute: {peak[1]} ballots from "
+                          f"{datetime.fromtimestamp(peak[0]).strftime('%H:%M')}").pack()
+        
+        # Fingerprint of every counted ballot; exports carry the same root
+        audit = self.current_election['audit']
+        ttk.Label(main_frame, 
+                 text=f"Ballot log root ({audit.size} ballots): {audit.root_hex()[:16]}...").pack()
+        
+        election = self.current_election
+        if election['ballot_type'] == 'ranked':
+            # Full preference count; the cards below show first preferences
+            outcome = count_stv(election['ranked'], election['seats'])
+            names = election['tally'].names
+            elected = ", ".join(names[idx] for idx in outcome['elected']) or "nobody"
+            method = "Instant-runoff" if election['seats'] == 1 else f"STV, {election['seats']} seats"
+            ttk.Label(main_frame, text=f"Elected: {elected}", 
+                     font=('Segoe UI', 14, 'bold')).pack(pady=5)
+            ttk.Label(main_frame, 
+                     text=f"{method}, decided in {len(outcome['rounds'])} rounds").pack()
+        
+        # Result cards in rank order; only the visible ones are built
+        election['tally'].take_changes()
+        grid = VirtualGrid(main_frame, self.make_result_card,
+                           lambda card, rank: self.fill_result_card(election, card, rank),
+                           row_height=RESULT_CARD_HEIGHT)
+        grid.pack(fill=tk.BOTH, expand=True)
+        grid.set_item_count(len(election['candidates']))
+        election['results_grid'] = grid
         
         # Button frame
         btn_frame = ttk.Frame(main_frame)
@@ -528,48 +1195,196 @@ class SchoolVotingSystem:
         new_btn = ttk.Button(btn_frame, text="Create New Election", 
                            command=self.show_election_setup)
         new_btn.pack(side=tk.LEFT, padx=10)
+        
+        if self.booth_client:
+            self.add_combined_label(btn_frame, election)
+        
+        self.current_election['view'] = 'completed'
+    
+    def make_result_card(self, parent):
+        result_card = ttk.Frame(parent, borderwidth=1, relief='solid')
+        
+        # Position label
+        position = ttk.Label(result_card, font=('Segoe UI', 14, 'bold'))
+        position.pack(anchor='w', padx=10, pady=5)
+        
+        # Details frame
+        details_frame = ttk.Frame(result_card)
+        details_frame.pack(fill=tk.X, padx=10, pady=5)
+        
+        # Photo
+        photo_label = ttk.Label(details_frame)
+        photo_label.pack(side=tk.LEFT, padx=10)
+        
+        # Votes
+        votes_label = ttk.Label(details_frame, font=('Segoe UI', 12))
+        votes_label.pack(side=tk.LEFT, padx=10, anchor='n', pady=5)
+        
+        # Symbol
+        symbol_label = ttk.Label(details_frame)
+        symbol_label.pack(side=tk.RIGHT, padx=10)
+        
+        return {
+            'frame': result_card,
+            'position': position,
+            'photo': photo_label,
+            'votes': votes_label,
+            'symbol': symbol_label
+        }
+    
+    def fill_result_card(self, election, card, rank):
+        tally = election['tally']
+        idx = tally.order[rank]
+        photo, symbol = self.candidate_images(election, idx)
+        card['position'].config(text=f"{rank+1}. {tally.names[idx]}")
+        card['photo'].config(image=photo)
+        if election['ballot_type'] == 'ranked':
+            card['votes'].config(text=f"First preferences: {tally.counts[idx]}")
+        else:
+            card['votes'].config(text=f"Total Votes: {tally.counts[idx]}")
+        card['symbol'].config(image=symbol)
+    
+    def update_results(self):
+        # Redraw only the result cards whose rank changed
+        election = self.current_election
+        changed = election['tally'].take_changes()
+        if changed:
+            election['results_grid'].refill(changed)
+    
+    def show_current_view(self):
+        election = self.current_election
+        status = election['status']
+        if self.cache_views and election.get('view') == status:
+            if status == 'setup':
+                self.candidate_entries = election['candidate_entries']
+            elif status == 'completed':
+                self.update_results()
+            return
+        if status == 'setup':
+            self.show_candidate_registration()
+        elif status == 'voting':
+            self.show_voting_interface()
+        else:
+            self.show_results()
     
     def save_results_to_file(self):
         if not self.current_election:
             return
         
-        election_data = {
-            'election_name': self.current_election['name'],
-            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'candidates': self.current_election['candidates'],
-            'votes': self.current_election['votes']
-        }
-        
         file_path = filedialog.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json")],
+            filetypes=[("JSON files", "*.json"),
+                       ("Ballots as CSV", "*.csv"),
+                       ("Ballots as JSON Lines", "*.jsonl"),
+                       ("Ballots, compact binary", "*.svb")],
             initialfile=f"{self.current_election['name']}_results.json"
         )
         
         if file_path:
             try:
-                with open(file_path, 'w') as f:
-                    json.dump(election_data, f, indent=4)
+                self.write_results(file_path)
                 messagebox.showinfo("Success", "Results saved successfully!")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to save file: {str(e)}")
     
+    def write_results(self, file_path):
+        self.flush_votes()
+        if file_path.lower().endswith('.json'):
+            self.save_summary_json(file_path)
+        else:
+            # Ballot-level export, streamed from storage
+            export_results(file_path, self.current_election['name'],
+                           self.current_election['tally'],
+                           self.store.iter_ballots(self.current_election['name']),
+                           self.current_election['ballot_type'], self.current_election['seats'])
+        self.log_event("Results saved", election=self.current_election['name'], path=file_path)
+    
+    def save_summary_json(self, file_path):
+        election_data = {
+            'election_name': self.current_election['name'],
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'candidates': self.current_election['candidates'],
+            'votes': self.current_election['tally'].votes(),
+            'ballot_type': self.current_election['ballot_type'],
+            'seats': self.current_election['seats'],
+            'ballots': self.current_election['audit'].size,
+            'merkle_root': self.current_election['audit'].root_hex()
+        }
+        with open(file_path, 'w') as f:
+            json.dump(election_data, f, indent=4)
+    
     def on_tab_change(self, event):
         selected_tab = self.notebook.select()
         tab_text = self.notebook.tab(selected_tab, "text")
         
         if tab_text == "Welcome":
-            self.show_welcome_screen()
+            if not self.cache_views or self.welcome_built_for != bool(self.elections):
+                self.show_welcome_screen()
         elif tab_text in self.elections:
             self.current_election = self.elections[tab_text]
-            if self.current_election['status'] == 'setup':
-                self.show_candidate_registration()
-            elif self.current_election['status'] == 'voting':
-                self.show_voting_interface()
-            else:
-                self.show_results()
+            # Whether the shared image cache dropped some of this tab's
+            # images while it was hidden
+            images_evicted = self.images.activate(tab_text)
+            if self.current_election['tally'] is None:
+                # Lazily loaded backend; fetch candidates and counts now
+                candidates, tally = self.store.load_election(tab_text)
+                self.current_election['candidates'] = candidates
+                self.current_election['tally'] = tally
+            if 'ballots' not in self.current_election:
+                self.load_ballots(self.current_election)
+            if (self.current_election['status'] != 'setup'
+                    and not self.current_election['images']):
+                # Restored from storage; images are loaded on first view
+                self.load_candidate_images()
+            self.show_current_view()
+            if images_evicted:
+                self.refill_images(self.current_election)
+    
+    def load_ballots(self, election):
+        # Per-ballot records, the audit tree and ranked ballots are only
+        # rebuilt for tabs that are opened, in one pass over stored votes
+        audit = MerkleLog()
+        ranked = None
+        if election['ballot_type'] == 'ranked' and election['status'] != 'setup':
+            ranked = RankedBallots(len(election['candidates']))
+        
+        def ballots():
+            for idx, cast_at, ranking in self.store.iter_votes(election['name']):
+                audit.append(idx, cast_at)
+                if ranked is not None and ranking is not None:
+                    ranked.add(ranking)
+                yield idx, cast_at
+        
+        election['ballots'] = BallotLog.from_ballots(ballots(), booth=self.booth_id)
+        election['audit'] = audit
+        if ranked is not None:
+            election['ranked'] = ranked
+            election['ranking'] = []
+    
+    def refill_images(self, election):
+        # A cached view still points at evicted images; refilling its cards
+        # reloads the ones on screen
+        grid = election.get({'voting': 'vote_grid', 'completed': 'results_grid'}
+                            .get(election['status']))
+        if grid is not None and grid.winfo_exists():
+            grid.refresh(refill=True)
 
 if __name__ == "__main__":
+    if sys.argv[1:2] == ['tally']:
+        # Headless: python school_voting.py tally <directory> [--output report.json]
+        import multiprocessing
+        from batch_tally import main
+        # Lets the process pool start workers from the frozen exe
+        multiprocessing.freeze_support()
+        sys.exit(main(sys.argv[2:]))
     root = tk.Tk()
     app = SchoolVotingSystem(root)
+    if '--exit-after-startup' in sys.argv[1:]:
+        # Used by benchmarks/bench_startup.py to time launches
+        def exit_when_ready():
+            if app.startup_done:
+                app.on_close()
+            else:
+                root.after(10, exit_when_ready)
+        exit_when_ready()
     root.mainloop()
\ No newline at end of file
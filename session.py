@@ -0,0 +1,79 @@
+# Session snapshots: a small JSON file describing every open election, so a
+# restart can put the tabs back without replaying the whole vote journal.
+#
+# Each election is stored as its settings, status, candidates, a Tally
+# snapshot and, for elections still in setup, the candidate details typed so
+# far. The file also records how far into the journal those counts go, and
+# where each election starts in it; on launch only the journal after that
+# point is replayed (see VoteJournal.load_elections) and the rest is loaded
+# per tab when it is first opened, reading from where that election starts.
+#
+# Snapshots are incremental: each election's JSON is cached with a version
+# key, only elections whose key changed are encoded again, and nothing is
+# written at all when no key (and no journal position) has moved. The file
+# is a cache, replaced atomically; if it is missing, stale or unreadable the
+# app falls back to the full journal.
+import json
+import os
+
+VERSION = 1
+
+
+class SessionSnapshot:
+    def __init__(self, path):
+        self.path = path
+        self.fragments = {}  # election name -> (version key, encoded JSON)
+        self.last_written = None
+
+    def read(self):
+        # The saved snapshot as a dict, or None if there isn't a usable one.
+        # Elections from it are cached, so ones never opened this session
+        # are written back unchanged.
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get('version') != VERSION:
+            return None
+        for election in snapshot['elections']:
+            self.fragments[election['name']] = (
+                ('saved',), json.dumps(election, separators=(',', ':')))
+        snapshot['elections'] = {e['name']: e for e in snapshot['elections']}
+        return snapshot
+
+    def write(self, elections, journal=None, journal_offset=None, journal_starts=None,
+              selected=None):
+        # elections: iterable of (name, version key, make_state), where
+        # make_state() builds the election's JSON-ready dict and is only
+        # called when its key differs from the cached one. A key of None
+        # keeps whatever was cached (an election not loaded this session).
+        # Returns True if the file was rewritten.
+        fragments = {}
+        for name, key, make_state in elections:
+            cached = self.fragments.get(name)
+            if key is None and cached is not None:
+                fragments[name] = cached
+            elif cached is not None and cached[0] == key:
+                fragments[name] = cached
+            else:
+                fragments[name] = (key, json.dumps(make_state(), separators=(',', ':')))
+        written = ([(name, f[0]) for name, f in fragments.items()], journal_offset,
+                   sorted(journal_starts.items()) if journal_starts else None, selected)
+        self.fragments = fragments
+        if written == self.last_written:
+            return False
+
+        head = json.dumps({'version': VERSION, 'journal': journal,
+                           'journal_offset': journal_offset, 'journal_starts': journal_starts,
+                           'selected': selected})
+        data = f'{head[:-1]}, "elections": [{",".join(f[1] for f in fragments.values())}]}}'
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp, self.path)
+        self.last_written = written
+        return True
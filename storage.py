@@ -0,0 +1,257 @@
+# SQLite storage backend for elections, candidates and individual ballots.
+#
+# Offers the same log_*/sync/close interface as journal.VoteJournal so the GUI
+# can use either. The database runs in WAL mode; ballots are buffered and
+# written with one executemany per batch (group commit, same max_pending /
+# max_delay settings as the journal). Startup only reads the small elections
+# table; candidates and vote counts are loaded per election on demand.
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from tally import Tally
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS elections (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    status TEXT NOT NULL DEFAULT 'setup',
+    ballot_type TEXT NOT NULL DEFAULT 'single',
+    seats INTEGER NOT NULL DEFAULT 1,
+    created_at REAL NOT NULL,
+    total_votes INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    election_id INTEGER NOT NULL REFERENCES elections(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    photo_path TEXT,
+    symbol_path TEXT,
+    PRIMARY KEY (election_id, idx)
+);
+CREATE TABLE IF NOT EXISTS ballots (
+    id INTEGER PRIMARY KEY,
+    election_id INTEGER NOT NULL REFERENCES elections(id) ON DELETE CASCADE,
+    candidate_idx INTEGER NOT NULL,
+    cast_at REAL NOT NULL,
+    ranking TEXT
+);
+CREATE INDEX IF NOT EXISTS ballots_by_candidate ON ballots (election_id, candidate_idx);
+"""
+
+# Columns added after the first release; older databases get them on open
+MIGRATIONS = [
+    ('elections', 'ballot_type', "TEXT NOT NULL DEFAULT 'single'"),
+    ('elections', 'seats', "INTEGER NOT NULL DEFAULT 1"),
+    ('ballots', 'ranking', "TEXT"),
+]
+
+
+class ElectionStore:
+    def __init__(self, path, max_delay=0.25, max_pending=100):
+        self.path = path
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self.pending = []  # (election_id, candidate_idx, cast_at, ranking JSON)
+        self.election_ids = {}
+        self._lock = threading.Lock()
+        self._dirty = threading.Event()
+        self._closed = False
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Used from the flusher thread too, always under self._lock
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        for table, column, definition in MIGRATIONS:
+            existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+        self._flusher = None
+        if max_delay is not None:
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    # Same interface as VoteJournal
+
+    def log_election(self, name, ballot_type='single', seats=1):
+        with self._lock:
+            cur = self.conn.execute(
+                "INSERT INTO elections (name, ballot_type, seats, created_at) VALUES (?, ?, ?, ?)",
+                (name, ballot_type, seats, time.time()))
+            self.election_ids[name] = cur.lastrowid
+
+    def log_candidates(self, name, candidates):
+        with self._lock:
+            self._flush_locked()
+            election_id = self._election_id(name)
+            with self.conn:
+                self.conn.execute("BEGIN")
+                self.conn.execute("DELETE FROM candidates WHERE election_id = ?", (election_id,))
+                self.conn.execute("DELETE FROM ballots WHERE election_id = ?", (election_id,))
+                self.conn.executemany(
+                    "INSERT INTO candidates (election_id, idx, name, photo_path, symbol_path) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    [(election_id, idx, c['name'], c.get('photo_path'), c.get('symbol_path'))
+                     for idx, c in enumerate(candidates)])
+                self.conn.execute("UPDATE elections SET total_votes = 0 WHERE id = ?", (election_id,))
+
+    def log_status(self, name, status):
+        with self._lock:
+            self._flush_locked()
+            self.conn.execute("UPDATE elections SET status = ? WHERE id = ?",
+                              (status, self._election_id(name)))
+
+    def log_discard(self, name):
+        with self._lock:
+            self.pending = [b for b in self.pending if b[0] != self.election_ids.get(name)]
+            self.conn.execute("DELETE FROM elections WHERE id = ?", (self._election_id(name),))
+            del self.election_ids[name]
+
+    def log_vote(self, name, candidate_idx, cast_at=None, ranking=None):
+        with self._lock:
+            if self._closed:
+                raise ValueError("Store is closed")
+            self.pending.append((self._election_id(name), candidate_idx,
+                                 time.time() if cast_at is None else cast_at,
+                                 None if ranking is None else json.dumps(ranking)))
+            if len(self.pending) >= self.max_pending:
+                self._flush_locked()
+            elif len(self.pending) == 1:
+                self._dirty.set()
+
+    def sync(self):
+        with self._lock:
+            if not self._closed:
+                self._flush_locked()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._flush_locked()
+            self._closed = True
+            self.conn.close()
+        self._dirty.set()
+        if self._flusher is not None:
+            self._flusher.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Loading
+
+    def position(self):
+        # Session snapshots replay the journal from a position; the database
+        # already loads each election on demand, so it has none
+        return None
+
+    def election_starts(self):
+        return None
+
+    def load_elections(self, snapshot=None):
+        # Metadata only: candidates and tally stay None until load_election()
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT id, name, status, ballot_type, seats FROM elections ORDER BY id").fetchall()
+        elections = OrderedDict()
+        for election_id, name, status, ballot_type, seats in rows:
+            self.election_ids[name] = election_id
+            elections[name] = {
+                'name': name,
+                'ballot_type': ballot_type,
+                'seats': seats,
+                'status': status,
+                'candidates': None,
+                'tally': None
+            }
+        return elections
+
+    def load_election(self, name):
+        # Candidates plus a Tally rebuilt from one grouped, indexed count
+        with self._lock:
+            self._flush_locked()
+            election_id = self._election_id(name)
+            rows = self.conn.execute(
+                "SELECT name, photo_path, symbol_path FROM candidates "
+                "WHERE election_id = ? ORDER BY idx", (election_id,)).fetchall()
+            counts = self.conn.execute(
+                "SELECT candidate_idx, COUNT(*) FROM ballots "
+                "WHERE election_id = ? GROUP BY candidate_idx", (election_id,)).fetchall()
+        candidates = [{'name': n, 'photo_path': p, 'symbol_path': s} for n, p, s in rows]
+        tally = Tally.from_counts([c['name'] for c in candidates], dict(counts))
+        return candidates, tally
+
+    def iter_ballots(self, name):
+        # (candidate_index, cast_at) in cast order
+        return self._iter_rows(
+            "SELECT candidate_idx, cast_at FROM ballots WHERE election_id = ? ORDER BY id", name)
+
+    def iter_votes(self, name):
+        # (candidate_index, cast_at, ranking or None) in one query
+        return ((idx, cast_at, json.loads(ranking) if ranking is not None else None)
+                for idx, cast_at, ranking in self._iter_rows(
+                    "SELECT candidate_idx, cast_at, ranking FROM ballots WHERE election_id = ? "
+                    "ORDER BY id", name))
+
+    def _iter_rows(self, query, name, batch_size=10000):
+        # Fetched in batches on a separate read connection so the vote path
+        # is never blocked by a long export
+        self.sync()
+        with self._lock:
+            election_id = self._election_id(name)
+        reader = sqlite3.connect(self.path)
+        try:
+            cur = reader.execute(query, (election_id,))
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            reader.close()
+
+    def _election_id(self, name):
+        election_id = self.election_ids.get(name)
+        if election_id is None:
+            row = self.conn.execute("SELECT id FROM elections WHERE name = ?", (name,)).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown election: {name}")
+            election_id = self.election_ids[name] = row[0]
+        return election_id
+
+    def _flush_locked(self):
+        if not self.pending:
+            return
+        batch, self.pending = self.pending, []
+        totals = {}
+        for election_id, _, _, _ in batch:
+            totals[election_id] = totals.get(election_id, 0) + 1
+        with self.conn:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO ballots (election_id, candidate_idx, cast_at, ranking) "
+                "VALUES (?, ?, ?, ?)", batch)
+            self.conn.executemany(
+                "UPDATE elections SET total_votes = total_votes + ? WHERE id = ?",
+                [(n, election_id) for election_id, n in totals.items()])
+
+    def _flush_loop(self):
+        while True:
+            self._dirty.wait()
+            if self._closed:
+                return
+            self._dirty.clear()
+            time.sleep(self.max_delay)
+            self.sync()
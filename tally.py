@@ -0,0 +1,153 @@
+# Tk-free vote counting core used by SchoolVotingSystem.
+# Candidates are addressed by name or by their registration index; counts live
+# in a plain list so every vote is a dict lookup plus a list increment.
+#
+# The tally also keeps a leaderboard (self.order) sorted as votes arrive:
+# most votes first, ties in registration order. A vote only moves its own
+# candidate up past the candidates it overtook, and every rank whose row
+# changed is remembered until take_changes() so views can redraw just those.
+from collections import Counter
+
+
+class Tally:
+    def __init__(self, candidate_names=()):
+        self.names = []
+        self.index = {}  # candidate name -> position in self.names / self.counts
+        self.counts = []
+        self.order = []  # candidate indices by rank
+        self.rank = []  # candidate index -> position in self.order
+        self.changed = set()  # ranks changed since the last take_changes()
+        for name in candidate_names:
+            self.add_candidate(name)
+
+    def add_candidate(self, name):
+        if name in self.index:
+            raise ValueError(f"Duplicate candidate name: {name}")
+        idx = len(self.names)
+        self.index[name] = idx
+        self.names.append(name)
+        self.counts.append(0)
+        # No votes and the highest index, so it always ranks last
+        self.rank.append(len(self.order))
+        self.order.append(idx)
+        self.changed.add(idx)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.index
+
+    @property
+    def total(self):
+        return sum(self.counts)
+
+    def count(self, name):
+        return self.counts[self._lookup(name)]
+
+    def cast(self, name):
+        idx = self._lookup(name)
+        self.counts[idx] += 1
+        self._promote(idx)
+
+    def cast_index(self, idx):
+        if not 0 <= idx < len(self.counts):
+            raise IndexError(f"Candidate index out of range: {idx}")
+        self.counts[idx] += 1
+        self._promote(idx)
+
+    def cast_many(self, names):
+        # Count the whole batch first so an unknown name rejects it without
+        # leaving a half-applied batch behind
+        batch = Counter(names)
+        index = self.index
+        for name in batch:
+            if name not in index:
+                raise KeyError(f"Unknown candidate: {name}")
+        counts = self.counts
+        for name, n in batch.items():
+            idx = index[name]
+            counts[idx] += n
+            self._promote(idx)
+        return sum(batch.values())
+
+    def cast_many_indices(self, indices):
+        batch = Counter(indices)
+        size = len(self.counts)
+        for idx in batch:
+            if not 0 <= idx < size:
+                raise IndexError(f"Candidate index out of range: {idx}")
+        counts = self.counts
+        for idx, n in batch.items():
+            counts[idx] += n
+            self._promote(idx)
+        return sum(batch.values())
+
+    def leaderboard(self):
+        # (name, votes) pairs, most votes first
+        return [(self.names[idx], self.counts[idx]) for idx in self.order]
+
+    def take_changes(self):
+        # Ranks whose candidate or vote count changed since the last call
+        changed = sorted(self.changed)
+        self.changed = set()
+        return changed
+
+    def votes(self):
+        return dict(zip(self.names, self.counts))
+
+    def snapshot(self):
+        # Detached copy; later casts don't show up in it
+        return {
+            'candidates': list(self.names),
+            'votes': self.votes(),
+            'total_votes': self.total
+        }
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        tally = cls(snapshot['candidates'])
+        return cls.from_counts(snapshot['candidates'],
+                               {tally._lookup(name): n for name, n in snapshot['votes'].items()})
+
+    @classmethod
+    def from_counts(cls, candidate_names, counts):
+        # counts: candidate index -> votes
+        tally = cls(candidate_names)
+        for idx, n in counts.items():
+            tally.counts[idx] = n
+            tally._promote(idx)
+        tally.changed = set()
+        return tally
+
+    def _promote(self, idx):
+        # Counts only grow, so a candidate can only move towards rank 0.
+        # Binary-search the ranks above it for its new place, then shift the
+        # overtaken candidates down one slot.
+        counts = self.counts
+        order = self.order
+        old = self.rank[idx]
+        key = (-counts[idx], idx)
+        lo, hi = 0, old
+        while lo < hi:
+            mid = (lo + hi) // 2
+            other = order[mid]
+            if (-counts[other], other) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < old:
+            order[lo + 1:old + 1] = order[lo:old]
+            order[lo] = idx
+            rank = self.rank
+            for pos in range(lo, old + 1):
+                rank[order[pos]] = pos
+            self.changed.update(range(lo, old + 1))
+        else:
+            self.changed.add(old)
+
+    def _lookup(self, name):
+        try:
+            return self.index[name]
+        except KeyError:
+            raise KeyError(f"Unknown candidate: {name}") from None
@@ -0,0 +1,56 @@
+from datetime import datetime
+
+import pytest
+
+import export
+from export import FORMATS, export_results, read_export
+from tally import Tally
+
+BALLOTS = [(2, 1700000000.5), (0, None), (2, 1700000003.25), (1, 1700000004.0)]
+
+
+def write(tmp_path, ext, ballots=BALLOTS, **options):
+    tally = Tally(['Ann', 'Ben', 'Cy'])
+    tally.cast_many_indices(idx for idx, _ in ballots)
+    path = str(tmp_path / f"results{ext}")
+    assert export_results(path, "Class, 7B", tally, ballots, **options) == len(ballots)
+    return list(read_export(path))
+
+
+class FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2025, 7, 28, 21, 44, 22)
+
+
+@pytest.fixture(autouse=True)
+def fixed_date(monkeypatch):
+    # Files written a second apart would otherwise differ in their date
+    monkeypatch.setattr(export, 'datetime', FixedDatetime)
+
+
+@pytest.mark.parametrize('ext', FORMATS)
+def test_round_trip(tmp_path, ext):
+    records = write(tmp_path, ext)
+    assert records[0] == {'type': 'election', 'election': "Class, 7B",
+                          'date': "2025-07-28 21:44:22", 'candidates': ['Ann', 'Ben', 'Cy'],
+                          'ballot_type': 'single', 'seats': 1}
+    assert [r for r in records if r['type'] == 'ballot'] == [
+        {'type': 'ballot', 'ballot': n, 'candidate_index': idx,
+         'candidate': ['Ann', 'Ben', 'Cy'][idx], 'cast_at': t}
+        for n, (idx, t) in enumerate(BALLOTS, 1)]
+    assert [(r['candidate'], r['votes']) for r in records if r['type'] == 'total'] == [
+        ('Ann', 1), ('Ben', 1), ('Cy', 2)]
+    assert records[-1]['type'] == 'audit' and records[-1]['ballots'] == len(BALLOTS)
+
+
+@pytest.mark.parametrize('ballots', [BALLOTS, []])
+def test_every_format_reads_back_the_same_records(tmp_path, ballots):
+    csv_records, jsonl_records, svb_records = (
+        write(tmp_path, ext, ballots, ballot_type='ranked', seats=2) for ext in FORMATS)
+    assert csv_records == jsonl_records == svb_records
+
+
+def test_unknown_format_is_refused(tmp_path):
+    with pytest.raises(ValueError):
+        write(tmp_path, '.xlsx')
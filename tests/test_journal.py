@@ -0,0 +1,131 @@
+import os
+
+from journal import VoteJournal
+from session import SessionSnapshot
+from tally import Tally
+
+
+def candidates(*names):
+    return [{'name': name, 'photo_path': None, 'symbol_path': None} for name in names]
+
+
+def start_election(journal, name, names, votes=()):
+    journal.log_election(name)
+    journal.log_candidates(name, candidates(*names))
+    journal.log_status(name, 'voting')
+    for idx in votes:
+        journal.log_vote(name, idx, cast_at=1700000000.0 + idx)
+
+
+def save_session(journal, elections, path, session=None):
+    # What SchoolVotingSystem.save_session writes, keyed the same way
+    session = session or SessionSnapshot(path)
+    starts = journal.election_starts()
+
+    def entries():
+        for name, state in elections.items():
+            key = (starts.get(name), state['ballot_type'], state['seats'], state['status'],
+                   state['tally'].total, len(state['candidates']))
+            yield name, key, lambda state=state: {
+                'name': name, 'ballot_type': state['ballot_type'], 'seats': state['seats'],
+                'status': state['status'], 'candidates': state['candidates'],
+                'tally': state['tally'].snapshot(), 'draft': None}
+
+    session.write(entries(), journal=os.path.abspath(journal.path),
+                  journal_offset=journal.position(), journal_starts=starts)
+    return session
+
+
+def test_replay_rebuilds_every_election(tmp_path):
+    path = str(tmp_path / 'votes.journal')
+    with VoteJournal(path) as journal:
+        start_election(journal, 'Class', ['A', 'B', 'C'], [0, 2, 2])
+        start_election(journal, 'Club', ['X', 'Y'], [1])
+        journal.log_status('Club', 'completed')
+        journal.log_election('Gone')
+        journal.log_discard('Gone')
+
+    with VoteJournal(path) as journal:
+        elections = journal.load_elections()
+        assert list(elections) == ['Class', 'Club']
+        assert elections['Class']['tally'].votes() == {'A': 1, 'B': 0, 'C': 2}
+        assert elections['Club']['status'] == 'completed'
+        assert list(journal.iter_ballots('Class')) == [
+            (0, 1700000000.0), (2, 1700000002.0), (2, 1700000002.0)]
+
+
+def test_snapshot_restore_matches_a_full_replay(tmp_path):
+    path = str(tmp_path / 'votes.journal')
+    session_path = str(tmp_path / 'session.json')
+    with VoteJournal(path) as journal:
+        start_election(journal, 'Early', ['A', 'B'], [0, 1, 1])
+        start_election(journal, 'Busy', ['C', 'D'], [0])
+        journal.sync()
+        save_session(journal, journal.load_elections(), session_path)
+        # After the snapshot: more votes for one election and a new one
+        journal.log_vote('Busy', 1)
+        journal.log_vote('Busy', 1)
+        start_election(journal, 'Late', ['E', 'F'], [1])
+
+    with VoteJournal(path) as journal:
+        full = journal.load_elections()
+    with VoteJournal(path) as journal:
+        restored = journal.load_elections(SessionSnapshot(session_path).read())
+        # Untouched since the snapshot, so only loaded when its tab opens
+        assert restored['Early']['tally'] is None
+        restored['Early']['candidates'], restored['Early']['tally'] = journal.load_election('Early')
+        assert list(restored) == list(full)
+        for name in full:
+            assert restored[name]['tally'].votes() == full[name]['tally'].votes()
+            assert restored[name]['candidates'] == full[name]['candidates']
+        assert [idx for idx, _ in journal.iter_ballots('Busy')] == [0, 1, 1]
+
+
+def test_recreated_election_is_not_restored_from_the_old_one(tmp_path):
+    path = str(tmp_path / 'votes.journal')
+    session_path = str(tmp_path / 'session.json')
+    with VoteJournal(path) as journal:
+        start_election(journal, 'Class', ['A', 'B'])
+        journal.sync()
+        elections = journal.load_elections()
+        session = save_session(journal, elections, session_path)
+        first_start = journal.election_starts()['Class']
+        # Same name, status, candidate count and total; other candidates
+        journal.log_discard('Class')
+        start_election(journal, 'Class', ['C', 'D'])
+        assert journal.election_starts()['Class'] != first_start
+        elections['Class']['candidates'] = candidates('C', 'D')
+        elections['Class']['tally'] = Tally(['C', 'D'])
+        save_session(journal, elections, session_path, session)
+
+    with VoteJournal(path) as journal:
+        restored = journal.load_elections(SessionSnapshot(session_path).read())
+        candidates_, tally = journal.load_election('Class')
+        assert [c['name'] for c in candidates_] == ['C', 'D']
+        assert tally.names == ['C', 'D']
+        assert restored['Class']['tally'] is None
+
+
+def test_stale_snapshot_falls_back_to_replay(tmp_path):
+    path = str(tmp_path / 'votes.journal')
+    session_path = str(tmp_path / 'session.json')
+    with VoteJournal(path) as journal:
+        start_election(journal, 'Class', ['A', 'B'], [1])
+        journal.sync()
+        save_session(journal, journal.load_elections(), session_path)
+    os.rename(path, str(tmp_path / 'moved.journal'))
+    with VoteJournal(str(tmp_path / 'moved.journal')) as journal:
+        elections = journal.load_elections(SessionSnapshot(session_path).read())
+        assert elections['Class']['tally'].votes() == {'A': 0, 'B': 1}
+
+
+def test_torn_last_record_is_dropped(tmp_path):
+    path = str(tmp_path / 'votes.journal')
+    with VoteJournal(path) as journal:
+        start_election(journal, 'Class', ['A', 'B'], [0])
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"op":"vote","election":"Cla')
+    with VoteJournal(path) as journal:
+        journal.log_vote('Class', 1)
+    with VoteJournal(path) as journal:
+        assert journal.load_elections()['Class']['tally'].votes() == {'A': 1, 'B': 1}
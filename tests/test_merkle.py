@@ -0,0 +1,79 @@
+# audit.py against a direct, recursive implementation of the RFC 6962 Merkle
+# tree hash (MTH) and audit path (PATH), section 2.1
+import hashlib
+
+import pytest
+
+import audit
+from audit import MerkleLog, inclusion_proof, leaf_hash, merkle_root, verify_inclusion
+from export import export_results
+from tally import Tally
+
+MAX_SIZE = 70
+EXPORT_SIZES = [0, 1, 7, 8, 9, 16, 17, 33, 70]
+
+
+def mth(leaves):
+    # RFC 6962 2.1: MTH({}) = SHA-256(), MTH({d0}) = SHA-256(0x00 || d0),
+    # otherwise split at the largest power of two below n
+    n = len(leaves)
+    if n == 0:
+        return hashlib.sha256(b'').digest()
+    if n == 1:
+        return leaves[0]
+    k = 1
+    while k * 2 < n:
+        k *= 2
+    return hashlib.sha256(b'\x01' + mth(leaves[:k]) + mth(leaves[k:])).digest()
+
+
+def path(m, leaves):
+    # RFC 6962 2.1.1: PATH(m, D[n])
+    n = len(leaves)
+    if n <= 1:
+        return []
+    k = 1
+    while k * 2 < n:
+        k *= 2
+    if m < k:
+        return path(m, leaves[:k]) + [mth(leaves[k:])]
+    return path(m - k, leaves[k:]) + [mth(leaves[:k])]
+
+
+def ballots(n):
+    return [(i % 5, 1700000000.0 + i * 0.25) for i in range(n)]
+
+
+@pytest.mark.parametrize('n', range(MAX_SIZE + 1))
+def test_roots_and_proofs_match_rfc6962(n):
+    leaves = [leaf_hash(idx, t) for idx, t in ballots(n)]
+    expected = mth(leaves)
+    log = MerkleLog()
+    log.extend(ballots(n))
+    assert log.root() == expected
+    assert log.size == n
+    assert merkle_root(leaves) == expected
+    for m in range(n):
+        proof = inclusion_proof(m, n, lambda lo, hi: mth(leaves[lo:hi]))
+        assert proof == path(m, leaves)
+        assert verify_inclusion(leaves[m], m, n, proof, expected)
+        if n > 1:
+            assert not verify_inclusion(leaves[m], m, n, proof, leaves[m])
+            assert not verify_inclusion(leaves[(m + 1) % n], m, n, proof, expected)
+            assert not verify_inclusion(leaves[m], (m + 1) % n, n, proof, expected)
+
+
+@pytest.mark.parametrize('n', EXPORT_SIZES)
+def test_exports_verify_and_prove_in_chunks(n, tmp_path, monkeypatch):
+    # A small chunk size so the parallel chunked path is exercised
+    monkeypatch.setattr(audit, 'CHUNK_SIZE', 8)
+    tally = Tally([f"Candidate {i}" for i in range(5)])
+    tally.cast_many_indices(idx for idx, _ in ballots(n))
+    file_path = str(tmp_path / f"{n}.svb")
+    export_results(file_path, "Check", tally, ballots(n))
+    leaves = [leaf_hash(idx, t) for idx, t in ballots(n)]
+    result = audit.verify_export(file_path, max_workers=2)
+    assert result['ok'] and result['root'] == mth(leaves).hex()
+    for number in range(1, n + 1):
+        proof = audit.prove_ballot(file_path, number, max_workers=2)
+        assert proof['ok'] and proof['proof'] == [h.hex() for h in path(number - 1, leaves)]
@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+from ranked import RankedBallots, count_stv  # noqa: E402
+
+
+def ballots(num_candidates, rankings):
+    result = RankedBallots(num_candidates)
+    for ranking, n in rankings:
+        for _ in range(n):
+            result.add(ranking)
+    return result
+
+
+def test_instant_runoff_transfers_from_the_last_candidate():
+    # A leads on first preferences, but C's ballots go to B
+    outcome = count_stv(ballots(3, [([0], 4), ([1, 2], 3), ([2, 1], 2)]), seats=1)
+    assert outcome['elected'] == [1]
+    assert outcome['rounds'][0]['excluded'] == [2]
+
+
+def test_majority_on_first_preferences_wins_in_one_round():
+    outcome = count_stv(ballots(3, [([0, 1], 6), ([1], 3), ([2], 2)]), seats=1)
+    assert outcome['elected'] == [0]
+    assert len(outcome['rounds']) == 1
+
+
+def test_stv_transfers_surplus_at_fractional_weight():
+    # 9 ballots, 2 seats: quota 4. A's surplus of 2 moves to B as 6 ballots
+    # at weight 1/3, which puts B (1 + 2) ahead of C (2)
+    outcome = count_stv(ballots(3, [([0, 1], 6), ([1], 1), ([2], 2)]), seats=2)
+    assert outcome['quota'] == 4.0
+    assert outcome['elected'][0] == 0
+    assert outcome['rounds'][1]['totals'][1] == pytest.approx(3.0)
+    assert outcome['elected'] == [0, 1]
+
+
+def test_ties_exclude_the_later_registered_candidate():
+    outcome = count_stv(ballots(3, [([0], 2), ([1], 2), ([2], 2)]), seats=1)
+    assert outcome['rounds'][0]['excluded'] == [2]
+
+
+def test_nobody_is_elected_without_ballots():
+    outcome = count_stv(RankedBallots(3), seats=1)
+    assert outcome['elected'] == []
+
+
+def test_seats_stay_open_once_every_ballot_is_exhausted():
+    outcome = count_stv(ballots(4, [([0], 3), ([1], 2)]), seats=3)
+    assert outcome['elected'] == [0, 1]
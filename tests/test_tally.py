@@ -0,0 +1,49 @@
+import pytest
+
+from tally import Tally
+
+
+def test_leaderboard_orders_by_votes_then_registration():
+    tally = Tally(['A', 'B', 'C', 'D'])
+    tally.cast_many(['C', 'C', 'B', 'D', 'B'])
+    assert tally.leaderboard() == [('B', 2), ('C', 2), ('D', 1), ('A', 0)]
+    tally.cast('D')
+    tally.cast('D')
+    assert [name for name, _ in tally.leaderboard()] == ['D', 'B', 'C', 'A']
+
+
+def test_order_matches_a_full_sort_after_every_vote():
+    tally = Tally([f"C{i}" for i in range(7)])
+    for i in range(200):
+        tally.cast_index((i * i + 3 * i) % 7)
+        expected = sorted(range(7), key=lambda idx: (-tally.counts[idx], idx))
+        assert tally.order == expected
+        assert all(tally.rank[idx] == pos for pos, idx in enumerate(tally.order))
+
+
+def test_take_changes_reports_moved_ranks_once():
+    tally = Tally(['A', 'B', 'C'])
+    tally.take_changes()
+    tally.cast('C')
+    assert tally.take_changes() == [0, 1, 2]
+    assert tally.take_changes() == []
+    tally.cast('C')
+    assert tally.take_changes() == [0]
+
+
+def test_bad_batch_is_rejected_whole():
+    tally = Tally(['A', 'B'])
+    with pytest.raises(KeyError):
+        tally.cast_many(['A', 'Nobody'])
+    with pytest.raises(IndexError):
+        tally.cast_many_indices([0, 2])
+    assert tally.counts == [0, 0]
+
+
+def test_snapshot_round_trip():
+    tally = Tally(['A', 'B', 'C'])
+    tally.cast_many_indices([2, 2, 0])
+    restored = Tally.from_snapshot(tally.snapshot())
+    assert restored.votes() == tally.votes()
+    assert restored.order == tally.order
+    assert restored.take_changes() == []
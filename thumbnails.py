@@ -0,0 +1,86 @@
+# On-disk cache of resized candidate images.
+#
+# Thumbnails are keyed by a hash of the source file's contents plus the target
+# size, so re-registering the same photo (or a copy of it under another name)
+# never decodes the full-size original again. Misses are decoded and resized
+# in a thread pool; callers turn the returned PIL images into PhotoImages on
+# the Tk thread.
+#
+# PIL is imported on first use so that starting the app doesn't pay for it.
+import hashlib
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+THUMBNAIL_DIR = os.path.join('elections', 'thumbnails')
+PHOTO_SIZE = (180, 180)
+SYMBOL_SIZE = (60, 60)
+
+# (path, mtime_ns, file size) -> content hash, so unchanged files are only
+# read and hashed once per process
+_hash_memo = {}
+
+
+def file_hash(path):
+    st = os.stat(path)
+    memo_key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    digest = _hash_memo.get(memo_key)
+    if digest is None:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        digest = h.hexdigest()
+        _hash_memo[memo_key] = digest
+    return digest
+
+
+def thumbnail_path(path, size, cache_dir=THUMBNAIL_DIR):
+    return os.path.join(cache_dir, f"{file_hash(path)}_{size[0]}x{size[1]}.png")
+
+
+def load_thumbnail(path, size, cache_dir=THUMBNAIL_DIR):
+    from PIL import Image
+
+    cached = thumbnail_path(path, size, cache_dir)
+    try:
+        with Image.open(cached) as img:
+            img.load()
+            return img
+    except (OSError, ValueError):
+        pass
+
+    with Image.open(path) as img:
+        # draft() lets JPEG decode at a reduced scale, which is most of the
+        # cost for large phone photos
+        img.draft('RGB', size)
+        thumb = img.convert('RGBA').resize(size, Image.LANCZOS)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            thumb.save(f, 'PNG')
+        os.replace(tmp, cached)
+    except OSError:
+        # A read-only or full cache directory only costs us the cache
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return thumb
+
+
+def load_thumbnails(requests, cache_dir=THUMBNAIL_DIR, max_workers=None):
+    # requests: iterable of (path, size). Returns a list in the same order
+    # holding either a PIL image or the exception raised while loading it.
+    requests = list(requests)
+
+    def work(request):
+        try:
+            return load_thumbnail(request[0], request[1], cache_dir)
+        except Exception as e:
+            return e
+
+    if len(requests) <= 1:
+        return [work(r) for r in requests]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(work, requests))
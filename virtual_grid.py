@@ -0,0 +1,111 @@
+# Windowed grid of fixed-size cards for long candidate lists.
+#
+# Only the cards that intersect the visible part of the canvas (plus an
+# overscan row above and below) exist as widgets. Cards that scroll out of
+# view go back to a pool and are refilled for whichever items scroll in, so
+# the widget count depends on the window size, not on the number of items.
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualGrid(ttk.Frame):
+    def __init__(self, master, make_card, fill_card, row_height, columns=1,
+                 padding=10, overscan=1, **kwargs):
+        # make_card(parent) -> dict of widgets with at least a 'frame' key
+        # fill_card(card, index) -> show item `index` in an existing card
+        super().__init__(master, **kwargs)
+        self.make_card = make_card
+        self.fill_card = fill_card
+        self.row_height = row_height
+        self.columns = columns
+        self.padding = padding
+        self.overscan = overscan
+        self.item_count = 0
+        self.visible = {}  # item index -> card
+        self.spare = []
+
+        self.canvas = tk.Canvas(self, highlightthickness=0)
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.yview)
+        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+
+        self.canvas.bind("<Configure>", lambda e: self.refresh(relayout=True))
+        self.bind_wheel(self.canvas)
+
+    def set_item_count(self, count):
+        self.item_count = count
+        rows = -(-count // self.columns)
+        self.canvas.configure(scrollregion=(0, 0, 0, rows * self.row_height))
+        self.refresh(refill=True)
+
+    def yview(self, *args):
+        self.canvas.yview(*args)
+        self.refresh()
+
+    def bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", lambda e: self.yview('scroll', -1 if e.delta > 0 else 1, 'units'))
+        widget.bind("<Button-4>", lambda e: self.yview('scroll', -1, 'units'))
+        widget.bind("<Button-5>", lambda e: self.yview('scroll', 1, 'units'))
+
+    def visible_range(self):
+        height = self.canvas.winfo_height()
+        top = self.canvas.canvasy(0)
+        first_row = max(0, int(top // self.row_height) - self.overscan)
+        last_row = int((top + height) // self.row_height) + self.overscan
+        return range(min(first_row * self.columns, self.item_count),
+                     min((last_row + 1) * self.columns, self.item_count))
+
+    def refresh(self, refill=False, relayout=False):
+        # refill: item contents changed, redraw every visible card
+        # relayout: the canvas was resized, recompute card positions
+        wanted = self.visible_range()
+
+        for idx in list(self.visible):
+            if idx not in wanted:
+                card = self.visible.pop(idx)
+                # Park it off-screen as well; not every Tk hides embedded
+                # windows for state='hidden'
+                self.canvas.itemconfigure(card['window'], state='hidden')
+                self.canvas.coords(card['window'], -10000, -10000)
+                self.spare.append(card)
+
+        cell_width = max(1, self.canvas.winfo_width() // self.columns)
+        for idx in wanted:
+            card = self.visible.get(idx)
+            if card is not None and not (refill or relayout):
+                continue
+            if card is None:
+                card = self.spare.pop() if self.spare else self.new_card()
+                self.visible[idx] = card
+                refill_card = True
+            else:
+                refill_card = refill
+            row, col = divmod(idx, self.columns)
+            self.canvas.coords(card['window'], col * cell_width + self.padding,
+                               row * self.row_height + self.padding)
+            self.canvas.itemconfigure(card['window'], state='normal',
+                                      width=max(1, cell_width - 2 * self.padding),
+                                      height=max(1, self.row_height - 2 * self.padding))
+            if refill_card:
+                self.fill_card(card, idx)
+
+    def refill(self, indices):
+        # Redraw the given items if they are on screen; others are filled
+        # when they scroll into view
+        for idx in indices:
+            card = self.visible.get(idx)
+            if card is not None:
+                self.fill_card(card, idx)
+
+    def new_card(self):
+        card = self.make_card(self.canvas)
+        card['window'] = self.canvas.create_window(0, 0, window=card['frame'], anchor="nw")
+        # Wheel events go to the widget under the pointer, so every part of
+        # the card has to forward them to the canvas
+        stack = [card['frame']]
+        while stack:
+            widget = stack.pop()
+            self.bind_wheel(widget)
+            stack.extend(widget.winfo_children())
+        return card